@@ -55,9 +55,27 @@ parfor i = 1:nFlights
         instructionFilePath = fullfile(instructionDirPath, instructionFileNames{i});
         [instrucCols, instructions] = lireFichierCSV(instructionFilePath);
 
-        turbulenceFileName = flightName + '_calmwind.csv';
-        turbulenceFilePath = fullfile(turbulenceDirPath, turbulenceFileName);
-        [turbCols, turbData] = lireFichierCSV(turbulenceFilePath);
+        % Binary files (see turbulence_generation/turbulence_io.py) are read when they exist
+        turbulenceFilePath = fullfile(turbulenceDirPath, flightName + '_calmwind.bin');
+        if isfile(turbulenceFilePath)
+            [turbCols, turbData] = lireFichierBinaire(turbulenceFilePath);
+        else
+            turbulenceFileName = flightName + '_calmwind.csv';
+            turbulenceFilePath = fullfile(turbulenceDirPath, turbulenceFileName);
+            [turbCols, turbData] = lireFichierCSV(turbulenceFilePath);
+        end
+
+        % Step table of the turbulence file (see turbulence_generation/step_table.py), read when it exists
+        [turbulenceDir, turbulenceName, turbulenceExt] = fileparts(turbulenceFilePath);
+        stepsFilePath = fullfile(turbulenceDir, turbulenceName + "_steps" + turbulenceExt);
+        stepsData = [];
+        if isfile(stepsFilePath)
+            if turbulenceExt == ".bin"
+                [~, stepsData] = lireFichierBinaire(stepsFilePath);
+            else
+                [~, stepsData] = lireFichierCSV(stepsFilePath);
+            end
+        end
         
         icingFileName = flightName + '_icing.csv';
         icingFilePath = fullfile(icingDataDirPath, icingFileName);
@@ -83,6 +101,9 @@ parfor i = 1:nFlights
         delta_t = 0.05;
         nb_steps = (tf-ti)/delta_t;
         t_steps = ti:delta_t:tf;
+        % The step table is only used if it was computed for this time step
+        useStepTable = size(stepsData, 1) >= nb_steps && nb_steps > 1 ...
+            && abs(stepsData(2, 1) - stepsData(1, 1) - delta_t) < 1e-9;
         hist_x = zeros(nb_steps+1, 16);
         hist_x(1,:) = x;
         hist_u = zeros(nb_steps+1, 8);
@@ -163,13 +184,22 @@ parfor i = 1:nFlights
             instruc = [target_route, target_airspeed, target_altitude, flaps_instruc];
 
             % Creating a subset of the turbulence and icing data to accelerate the computation
-            turbDataIndices = (turbData(:, 1) >= t-1) & (turbData(:, 1) <= t+delta_t+1);
-            turbDataSmall = turbData(turbDataIndices, :);
+            if useStepTable
+                % Columns of the step table : time, turbulence, u, v, w, p, q, r, first row, last row
+                turbDataSmall = turbData(stepsData(j, 9):stepsData(j, 10), :);
+            else
+                turbDataIndices = (turbData(:, 1) >= t-1) & (turbData(:, 1) <= t+delta_t+1);
+                turbDataSmall = turbData(turbDataIndices, :);
+            end
             icingDataIndices = (icingData(:, 1) >= t-2) & (icingData(:, 1) <= t+delta_t+2);
             icingDataSmall = icingData(icingDataIndices, :);
 
             % Getting usefulll intermediate variables from the simulation
-            turb = getTurbulence(t, turbDataSmall);
+            if useStepTable
+                turb = stepsData(j, 2:8)';
+            else
+                turb = getTurbulence(t, turbDataSmall);
+            end
             icing = interp1(icingDataSmall(:,1), icingDataSmall(:,2), t, 'previous');
             [CD,CL,CY,Cl,Cm,Cn,Thrust,airDens,airPres,temp,V,Mach,alphar,betar,gammar,xir,nx,ny,nz,xdot1,xdot2,xdot3,xdot7,xdot8,xdot9] = GetUsefullVars(x, u, t, turbDataSmall, icingDataSmall);
 
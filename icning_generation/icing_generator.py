@@ -1,9 +1,23 @@
-import random
 import os
+import sys
+from contextlib import nullcontext
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+# The flight random generators and the build manifest are shared with the turbulence generation
+TURBULENCE_GENERATION_DIR = (
+    Path(__file__).resolve().parent.parent / "turbulence_generation"
+)
+sys.path.append(str(TURBULENCE_GENERATION_DIR))
+from build_manifest import get_code_version  # noqa: E402
+from flight_rng import get_flight_rng  # noqa: E402
+
+ICING_STREAM = 1  # Stream id of the icing generators (see flight_rng.get_flight_rng)
+# Source files whose modification makes the generated files stale (see build_manifest)
+GENERATION_SOURCES = (Path(__file__), TURBULENCE_GENERATION_DIR / "flight_rng.py")
+
 
 def create_icing_time_files(
     instruction_dir_path,
@@ -12,6 +26,11 @@ def create_icing_time_files(
     icing_duration=180,
     nb_icing_events=3,
     max_icing=1,
+    seed=None,
+    profiler=None,
+    ramp_duration=0,
+    file_layout="dense",
+    manifest=None,
 ):
     """
     Create the files indicating the times of icing for all instruction files in the instruction directory.
@@ -22,21 +41,94 @@ def create_icing_time_files(
     - freq : frequency of the output files in Hz
     - icing_duration : duration of the icing events in seconds
     - nb_icing_events : number of icing events per instruction file
+    - max_icing : icing severity during the events
+    - seed : master seed. The random generator of each flight is derived from the master seed
+    and the flight name (see flight_rng.get_flight_rng), so a single file can be regenerated on its own.
+    - profiler : optional profiler recording the time spent in each stage and the bytes written,
+    per flight (turbulence_generation/profiling.StageProfiler)
+    - ramp_duration : duration in seconds of the increase and decrease of the icing severity at
+    the boundaries of the events (0 for a step)
+    - file_layout : “dense” for one row per sample (<flight>_icing.csv), “events” for one row
+    (start, end, level) per icing event (<flight>_icing_events.csv, see
+    turbulence_generation/event_list.py). The events layout needs ramp_duration = 0.
+    - manifest : optional build manifest (turbulence_generation/build_manifest.BuildManifest).
+    With a manifest, the files which are up to date (same flight plan content, parameters, seed
+    and code) are skipped. Without seed, the files cannot be reproduced, so they are always
+    regenerated and never recorded as up to date.
     """
+    if file_layout not in ("dense", "events"):
+        raise ValueError(f"Unknown file layout: {file_layout}")
+    if file_layout == "events" and ramp_duration != 0:
+        raise ValueError("Ramped icing events cannot be written in the events layout")
+    file_suffix = "_icing.csv" if file_layout == "dense" else "_icing_events.csv"
+    parameters = {
+        "freq": freq,
+        "icing_duration": icing_duration,
+        "nb_icing_events": nb_icing_events,
+        "max_icing": np.asarray(max_icing).tolist(),
+        "ramp_duration": ramp_duration,
+        "file_layout": file_layout,
+    }
+    code_version = get_code_version(GENERATION_SOURCES)
     instruct_files = instruction_dir_path.glob("*.csv")
     for instruct_file in instruct_files:
-        df = pd.read_csv(instruct_file)
-        flight_duration = df["timestamp"].iloc[-1]
-        icing_df = create_icing_df(
-            flight_duration, freq, icing_duration, nb_icing_events, max_icing=max_icing
-        )
-        icing_df.to_csv(
-            output_dir_path / f"{instruct_file.stem}_icing.csv", index=False
-        )
+        icing_file_path = output_dir_path / f"{instruct_file.stem}{file_suffix}"
+        build = (icing_file_path, instruct_file, parameters, seed, code_version)
+        if manifest is not None:
+            if seed is not None and manifest.is_up_to_date(*build):
+                continue
+            manifest.mark_started(*build)
+        with _profiler_context(profiler, "flight", instruct_file.stem):
+            with _profiler_context(profiler, "stage", "read_instructions"):
+                df = pd.read_csv(instruct_file)
+            flight_duration = df["timestamp"].iloc[-1]
+            with _profiler_context(profiler, "stage", "generate"):
+                rng = get_flight_rng(seed, instruct_file.stem, stream=ICING_STREAM)
+                if file_layout == "dense":
+                    icing_df = create_icing_df(
+                        flight_duration,
+                        freq,
+                        icing_duration,
+                        nb_icing_events,
+                        max_icing=max_icing,
+                        rng=rng,
+                        ramp_duration=ramp_duration,
+                    )
+                else:
+                    icing_df = create_icing_events_df(
+                        flight_duration,
+                        freq,
+                        icing_duration,
+                        nb_icing_events,
+                        max_icing=max_icing,
+                        rng=rng,
+                    )
+            with _profiler_context(profiler, "stage", "write"):
+                icing_df.to_csv(icing_file_path, index=False)
+            if profiler is not None:
+                profiler.add_bytes("write", icing_file_path.stat().st_size)
+        if manifest is not None and seed is not None:
+            manifest.mark_done(icing_file_path)
+
+
+def _profiler_context(profiler, method, name):
+    """
+    Returns the context manager profiler.<method>(name), or a context manager doing nothing
+    without profiler.
+    """
+    if profiler is None:
+        return nullcontext()
+    return getattr(profiler, method)(name)
 
 
 def create_icing_df(
-    flight_duration, freq, icing_duration, nb_icing_events, max_icing=1
+    flight_duration,
+    freq,
+    icing_duration,
+    nb_icing_events,
+    max_icing=1,
+    rng=None,
+    ramp_duration=0,
 ):
     """
     Create a DataFrame with the times of icing events.
@@ -45,21 +137,133 @@ def create_icing_df(
     - freq : frequency of the output files in Hz
     - icing_duration : duration of the icing events in seconds
     - nb_icing_events : number of icing events
+    - max_icing : icing severity during the events, scalar or one value per event
+    - rng : numpy random generator (np.random.Generator) or seed
+    - ramp_duration : duration in seconds of the linear increase of the icing severity at the
+    beginning of the events and of its decrease at the end (0 for a step)
     """
-    icing_df = pd.DataFrame(
-        {"timestamp": np.arange((flight_duration + 2) * freq) / freq}
+    nb_samples = int(round((flight_duration + 2) * freq))
+    start_indexes, end_indexes = _draw_icing_intervals(
+        flight_duration, freq, icing_duration, nb_icing_events, rng
+    )
+    return pd.DataFrame(
+        {
+            "timestamp": np.arange(nb_samples) / freq,
+            "icing": icing_intervals_to_array(
+                nb_samples,
+                start_indexes,
+                end_indexes,
+                max_icing,
+                ramp_length=int(round(ramp_duration * freq)),
+            ),
+        },
+        copy=False,  # The arrays are new, copying them into blocks is not needed
     )
-    icing_df["icing"] = 0
 
-    starting_indexes = [
-        random.randint(
-            0, flight_duration * freq - nb_icing_events * icing_duration * freq
+
+def create_icing_events_df(
+    flight_duration, freq, icing_duration, nb_icing_events, max_icing=1, rng=None
+):
+    """
+    Create a DataFrame with one row (start, end, level) per icing event, the layout of the
+    events files (turbulence_generation/event_list.py). The events are the ones of
+    create_icing_df with the same parameters and random generator state.
+    Parameters :
+    - flight_duration : duration of the flight in seconds
+    - freq : frequency at which the start and end times are drawn, in Hz
+    - icing_duration : duration of the icing events in seconds
+    - nb_icing_events : number of icing events
+    - max_icing : icing severity during the events, scalar or one value per event
+    - rng : numpy random generator (np.random.Generator) or seed
+    """
+    start_indexes, end_indexes = _draw_icing_intervals(
+        flight_duration, freq, icing_duration, nb_icing_events, rng
+    )
+    return pd.DataFrame(
+        {
+            "start": start_indexes / freq,
+            "end": end_indexes / freq,
+            "level": np.broadcast_to(max_icing, nb_icing_events),
+        }
+    )
+
+
+def _draw_icing_intervals(flight_duration, freq, icing_duration, nb_icing_events, rng):
+    event_length = int(round(icing_duration * freq))
+    return generate_icing_intervals(
+        int(round(flight_duration * freq)),
+        np.full(nb_icing_events, event_length),
+        rng=rng,
+    )
+
+
+def generate_icing_intervals(nb_samples, event_lengths, rng=None):
+    """
+    Draws non-overlapping icing events in a flight of nb_samples samples.
+    The samples without icing are shared out uniformly between the gaps before, between and after
+    the events: the events are inserted at sorted uniform positions of the samples without icing.
+    Parameters :
+    - nb_samples : number of samples of the flight
+    - event_lengths : length of each event in samples, in the order of the events
+    - rng : numpy random generator (np.random.Generator) or seed
+    Returns :
+    - start_indexes : first sample of each event
+    - end_indexes : sample following the last sample of each event
+    """
+    rng = np.random.default_rng(rng)
+    event_lengths = np.asarray(event_lengths, dtype=np.int64)
+    no_icing_length = nb_samples - event_lengths.sum()
+    if no_icing_length < 0:
+        raise ValueError(
+            f"The icing events ({event_lengths.sum()} samples) do not fit in the flight "
+            f"({nb_samples} samples)"
+        )
+    insertion_indexes = np.sort(
+        rng.integers(0, no_icing_length, size=len(event_lengths), endpoint=True)
+    )
+    start_indexes = insertion_indexes + np.cumsum(event_lengths) - event_lengths
+    return start_indexes, start_indexes + event_lengths
+
+
+def icing_intervals_to_array(
+    nb_samples, start_indexes, end_indexes, max_icing=1, ramp_length=0
+):
+    """
+    Returns the icing severity of each sample, 0 outside of the events.
+    Parameters :
+    - nb_samples : number of samples
+    - start_indexes, end_indexes : sorted non-overlapping events, end_indexes excluded
+    (see generate_icing_intervals)
+    - max_icing : icing severity during the events, scalar or one value per event
+    - ramp_length : number of samples of the linear increase of the severity at the beginning of
+    the events and of its decrease at the end (0 for a step). The severity of events shorter than
+    2 * ramp_length does not reach max_icing.
+    """
+    start_indexes = np.asarray(start_indexes, dtype=np.int64)
+    end_indexes = np.asarray(end_indexes, dtype=np.int64)
+    nb_events = len(start_indexes)
+    max_icing = np.broadcast_to(max_icing, nb_events)
+    if ramp_length > 0:
+        max_icing = max_icing.astype(float)
+
+    # Constant pieces: gap, event, gap, event, ..., gap
+    boundaries = np.empty(2 * nb_events + 2, dtype=np.int64)
+    boundaries[0] = 0
+    boundaries[1:-1:2] = start_indexes
+    boundaries[2:-1:2] = end_indexes
+    boundaries[-1] = nb_samples
+    values = np.zeros(2 * nb_events + 1, dtype=max_icing.dtype)
+    values[1::2] = max_icing
+    icing = np.repeat(values, np.diff(boundaries))
+
+    if ramp_length > 0 and nb_events > 0:
+        event_lengths = end_indexes - start_indexes
+        in_event = np.repeat(np.arange(2 * nb_events + 1) % 2 == 1, np.diff(boundaries))
+        event_length = np.repeat(event_lengths, event_lengths)
+        position = np.arange(event_lengths.sum()) - np.repeat(
+            np.cumsum(event_lengths) - event_lengths, event_lengths
+        )
+        icing[in_event] *= np.minimum(
+            np.minimum(position + 1, event_length - position) / ramp_length, 1
         )
-        for _ in range(nb_icing_events)
-    ]
-    starting_indexes.sort()
-    for i, index in enumerate(starting_indexes):
-        start_index = index + i * icing_duration * freq
-        end_index = start_index + icing_duration * freq
-        icing_df.loc[start_index:end_index, "icing"] = max_icing
-    return icing_df
+    return icing
@@ -0,0 +1,76 @@
+function [nomsColonnes, donnees] = lireFichierBinaire(nomFichier)
+    % Lecture d'un fichier .bin ou .npy écrit par turbulence_generation/turbulence_io.py
+    % Les données sont des flottants little-endian rangés ligne par ligne, elles peuvent
+    % aussi être projetées en mémoire avec memmapfile à partir de l'offset de l'en-tête.
+    % La colonne de temps en tête est toujours en double, même dans les fichiers float32.
+    [~, ~, extension] = fileparts(nomFichier);
+    fichier = fopen(nomFichier, 'r', 'ieee-le');
+
+    if strcmp(extension, '.npy')
+        [nomsColonnes, taillesValeurs, numLignes] = lireEnTeteNpy(fichier);
+    else
+        [nomsColonnes, taillesValeurs, numLignes] = lireEnTeteBinaire(fichier);
+    end
+    numColonnes = numel(nomsColonnes);
+
+    if all(taillesValeurs == taillesValeurs(1))
+        % Lecture des données : fread remplit par colonnes, d'où la transposition
+        donnees = fread(fichier, [numColonnes, numLignes], ...
+            [precisionFlottant(taillesValeurs(1)) '=>double']);
+        donnees = donnees';
+    else
+        % Types différents : lecture colonne par colonne en sautant le reste de la ligne
+        debutDonnees = ftell(fichier);
+        tailleLigne = sum(taillesValeurs);
+        decalages = [0, cumsum(taillesValeurs(1:end - 1))];
+        donnees = zeros(numLignes, numColonnes);
+        for colonne = 1:numColonnes
+            fseek(fichier, debutDonnees + decalages(colonne), 'bof');
+            donnees(:, colonne) = fread(fichier, numLignes, ...
+                [precisionFlottant(taillesValeurs(colonne)) '=>double'], ...
+                tailleLigne - taillesValeurs(colonne));
+        end
+    end
+
+    % Fermeture du fichier
+    fclose(fichier);
+end
+
+function [nomsColonnes, taillesValeurs, numLignes] = lireEnTeteBinaire(fichier)
+    magique = fread(fichier, [1, 8], 'char=>char');
+    if ~strcmp(magique, 'FSIMBIN1')
+        error('lireFichierBinaire:format', 'Le fichier n''est pas un fichier FSIMBIN1');
+    end
+    tailleEnTete = fread(fichier, 1, 'uint32');
+    tailleValeur = fread(fichier, 1, 'uint32');
+    numLignes = fread(fichier, 1, 'uint64');
+    numColonnes = fread(fichier, 1, 'uint32');
+    numColonnesDouble = fread(fichier, 1, 'uint32'); % premières colonnes en double
+    noms = fread(fichier, [1, tailleEnTete - 32], 'char=>char');
+    noms = noms(noms ~= char(0));
+    nomsColonnes = string(strsplit(noms, ','));
+    taillesValeurs = repmat(tailleValeur, 1, numColonnes);
+    taillesValeurs(1:numColonnesDouble) = 8;
+end
+
+function [nomsColonnes, taillesValeurs, numLignes] = lireEnTeteNpy(fichier)
+    fread(fichier, [1, 8], 'uint8'); % chaîne magique et version 1.0
+    tailleEnTete = fread(fichier, 1, 'uint16');
+    enTete = fread(fichier, [1, tailleEnTete], 'char=>char');
+
+    % Noms et types des champs : ('nom', '<f8')
+    champs = regexp(enTete, '\(''([^'']*)'', ''<f(\d)''\)', 'tokens');
+    nomsColonnes = string(cellfun(@(champ) champ{1}, champs, 'UniformOutput', false));
+    taillesValeurs = cellfun(@(champ) str2double(champ{2}), champs);
+
+    forme = regexp(enTete, '''shape'': \((\d+),\)', 'tokens');
+    numLignes = str2double(forme{1}{1});
+end
+
+function precision = precisionFlottant(tailleValeur)
+    if tailleValeur == 4
+        precision = 'single';
+    else
+        precision = 'double';
+    end
+end
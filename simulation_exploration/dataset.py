@@ -0,0 +1,220 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from variable_correspondence import VARIABLE_DESCRIPTION
+
+"""
+Parquet dataset of the simulation files (<flight>_simulated.csv), partitioned by flight:
+    <dataset>/flight=<flight name>/part-0.parquet
+    <dataset>/_flights.parquet
+The columns keep the variable names of the simulation files (keys of VARIABLE_DESCRIPTION, the
+descriptions are stored in the metadata of the fields). The Turbulence and Icing flags are stored
+as int8. The row groups hold ROW_GROUP_SIZE rows, so that filters on the flags or on the time
+skip the row groups which do not match.
+_flights.parquet has one row per flight with the source file (size and modification time, used
+to convert only the new or modified files), the number of rows, the duration and the
+proportions of time in turbulence and in icing conditions.
+"""
+
+FLAG_COLUMNS = ("Turbulence", "Icing")
+ROW_GROUP_SIZE = 12000  # 10 minutes at the 0.05 s step of the simulation
+FLIGHTS_FILE_NAME = "_flights.parquet"
+SIMULATION_FILE_SUFFIX = "_simulated.csv"
+
+
+def convert_simulation_dir(
+    simulation_dir_path, dataset_dir_path, workers=4, compression="zstd"
+):
+    """
+    Converts the simulation files of a directory to the dataset. Only the files which are new or
+    were modified since their last conversion are converted, and the flights whose simulation
+    file was deleted are removed from the dataset.
+    Parameters :
+    - simulation_dir_path: path of the directory containing the simulation files
+    - dataset_dir_path: path of the dataset directory, created if needed
+    - workers: number of processes converting files in parallel
+    - compression: compression codec of the parquet files
+    Returns the dataframe of the flights metadata (see read_flights).
+    """
+    dataset_dir_path.mkdir(parents=True, exist_ok=True)
+    flights = read_flights(dataset_dir_path)
+    converted_sources = {
+        (row.source_file, row.source_size, row.source_mtime_ns)
+        for row in flights.itertuples()
+    }
+    source_files = set()
+    file_paths = list()
+    for file_path in sorted(simulation_dir_path.glob("*" + SIMULATION_FILE_SUFFIX)):
+        source_files.add(file_path.name)
+        stat = file_path.stat()
+        if (file_path.name, stat.st_size, stat.st_mtime_ns) not in converted_sources:
+            file_paths.append(file_path)
+    # The partitions are removed before their rows of the flights metadata, so that an
+    # interrupted conversion removes them again
+    is_deleted = ~flights["source_file"].isin(source_files)
+    for flight in flights.loc[is_deleted, "flight"]:
+        shutil.rmtree(dataset_dir_path / f"flight={flight}", ignore_errors=True)
+    flights = flights[~is_deleted].reset_index(drop=True)
+    if workers == 1:
+        new_flights = [
+            convert_simulation_file(file_path, dataset_dir_path, compression)
+            for file_path in file_paths
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            new_flights = list(
+                executor.map(
+                    convert_simulation_file,
+                    file_paths,
+                    [dataset_dir_path] * len(file_paths),
+                    [compression] * len(file_paths),
+                )
+            )
+    if new_flights:
+        new_flights = pd.DataFrame(new_flights)
+        flights = flights[~flights["flight"].isin(new_flights["flight"])]
+        if not flights.empty:
+            new_flights = pd.concat([flights, new_flights], ignore_index=True)
+        flights = new_flights.sort_values("flight", ignore_index=True)
+    if file_paths or is_deleted.any():
+        _write_atomically(
+            pa.Table.from_pandas(flights, preserve_index=False),
+            dataset_dir_path / FLIGHTS_FILE_NAME,
+        )
+    return flights
+
+
+def convert_simulation_file(file_path, dataset_dir_path, compression="zstd"):
+    """
+    Converts a simulation file to the partition of its flight in the dataset, and returns the
+    metadata of the flight (a row of read_flights).
+    """
+    stat = file_path.stat()
+    table = pv.read_csv(file_path)
+    unknown_columns = [
+        column for column in table.column_names if column not in VARIABLE_DESCRIPTION
+    ]
+    if unknown_columns:
+        raise ValueError(
+            f"Unknown simulation variables in {file_path}: {unknown_columns}"
+        )
+    fields = list()
+    columns = list()
+    for name, column in zip(table.column_names, table.columns):
+        if name in FLAG_COLUMNS:
+            column = pc.cast(column, pa.int8())
+        columns.append(column)
+        fields.append(
+            pa.field(
+                name,
+                column.type,
+                metadata={"description": VARIABLE_DESCRIPTION[name]},
+            )
+        )
+    table = pa.Table.from_arrays(columns, schema=pa.schema(fields))
+
+    flight = file_path.name[: -len(SIMULATION_FILE_SUFFIX)]
+    partition_dir_path = dataset_dir_path / f"flight={flight}"
+    partition_dir_path.mkdir(exist_ok=True)
+    _write_atomically(
+        table,
+        partition_dir_path / "part-0.parquet",
+        row_group_size=ROW_GROUP_SIZE,
+        compression=compression,
+    )
+    time = table["time"]
+    return {
+        "flight": flight,
+        "source_file": file_path.name,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "nb_rows": table.num_rows,
+        "duration_s": (
+            pc.max(time).as_py() - pc.min(time).as_py() if table.num_rows else 0.0
+        ),
+        "turbulence_part": _flag_part(table, "Turbulence"),
+        "icing_part": _flag_part(table, "Icing"),
+    }
+
+
+def read_flights(dataset_dir_path):
+    """
+    Returns the dataframe of the flights metadata of the dataset, empty if the dataset does not
+    exist yet.
+    """
+    flights_file_path = dataset_dir_path / FLIGHTS_FILE_NAME
+    if not flights_file_path.exists():
+        return pd.DataFrame(
+            columns=[
+                "flight",
+                "source_file",
+                "source_size",
+                "source_mtime_ns",
+                "nb_rows",
+                "duration_s",
+                "turbulence_part",
+                "icing_part",
+            ]
+        )
+    return pq.read_table(flights_file_path).to_pandas()
+
+
+def read_dataset(
+    dataset_dir_path, columns=None, filters=None, flights=None, descriptive_names=False
+):
+    """
+    Reads the dataset into a dataframe with a “flight” column. Only the requested columns and
+    the row groups which can match the filters are read.
+    Parameters :
+    - dataset_dir_path: path of the dataset directory
+    - columns: variables to read (keys of VARIABLE_DESCRIPTION), all by default
+    - filters: row filters in the pyarrow.parquet.read_table format, for example
+    [("Icing", "==", 1), ("time", ">=", 600)]
+    - flights: names of the flights to read, all by default
+    - descriptive_names: if True, the columns are renamed with VARIABLE_DESCRIPTION
+    """
+    if columns is not None:
+        unknown_columns = [
+            column for column in columns if column not in VARIABLE_DESCRIPTION
+        ]
+        if unknown_columns:
+            raise ValueError(f"Unknown simulation variables: {unknown_columns}")
+        columns = list(columns) + ["flight"]
+    filters = list(filters or [])
+    if flights is not None:
+        filters.append(("flight", "in", list(flights)))
+    table = pq.read_table(
+        dataset_dir_path,
+        columns=columns,
+        filters=filters or None,
+        partitioning="hive",
+    )
+    data = table.to_pandas()
+    data["flight"] = data["flight"].astype(str)
+    if descriptive_names:
+        data = data.rename(columns=VARIABLE_DESCRIPTION)
+    return data
+
+
+def _flag_part(table, column):
+    if column not in table.column_names or table.num_rows == 0:
+        return 0.0
+    return pc.mean(pc.not_equal(table[column], 0)).as_py()
+
+
+def _write_atomically(table, file_path, **kwargs):
+    # Hidden from the dataset discovery, which ignores the files starting with “.” or “_”
+    tmp_file_path = file_path.with_name("." + file_path.name + ".tmp")
+    try:
+        pq.write_table(table, tmp_file_path, **kwargs)
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if tmp_file_path.exists():
+            tmp_file_path.unlink()
@@ -26,3 +26,57 @@ def dcm(phi, theta, psi):
             ],
         ]
     )
+
+
+def dcm_array(phi, theta, psi, out=None):
+    """
+    Direction Cosine Matrices (DCM) of a series of Euler angles, as a (N, 3, 3) array. Row n is
+    dcm(phi[n], theta[n], psi[n]), the sines and cosines are computed once per angle.
+    Parameters :
+    - phi, theta, psi: arrays of N roll, pitch and yaw angles in radians
+    - out: optional (N, 3, 3) array where the matrices are written
+    """
+    sinR = np.sin(phi)
+    cosR = np.cos(phi)
+    sinP = np.sin(theta)
+    cosP = np.cos(theta)
+    sinY = np.sin(psi)
+    cosY = np.cos(psi)
+    if out is None:
+        out = np.empty(np.shape(sinR) + (3, 3), dtype=np.result_type(sinR, float))
+    sinR_sinP = sinR * sinP
+    cosR_sinP = cosR * sinP
+    out[..., 0, 0] = cosP * cosY
+    out[..., 0, 1] = cosP * sinY
+    out[..., 0, 2] = -sinP
+    out[..., 1, 0] = sinR_sinP * cosY - cosR * sinY
+    out[..., 1, 1] = sinR_sinP * sinY + cosR * cosY
+    out[..., 1, 2] = sinR * cosP
+    out[..., 2, 0] = cosR_sinP * cosY + sinR * sinY
+    out[..., 2, 1] = cosR_sinP * sinY - sinR * cosY
+    out[..., 2, 2] = cosR * cosP
+    return out
+
+
+def earth_to_body(vectors, phi, theta, psi, out=None):
+    """
+    Rotates (N, 3) vectors from the Earth frame to the body frame, row n with the angles phi[n],
+    theta[n], psi[n].
+    Parameters :
+    - vectors: (N, 3) array of vectors in the Earth frame
+    - phi, theta, psi: arrays of N roll, pitch and yaw angles in radians
+    - out: optional (N, 3) array where the rotated vectors are written
+    """
+    return np.einsum("nij,nj->ni", dcm_array(phi, theta, psi), vectors, out=out)
+
+
+def body_to_earth(vectors, phi, theta, psi, out=None):
+    """
+    Rotates (N, 3) vectors from the body frame to the Earth frame (transposed DCM), for example
+    the (ub, vb, wb) velocities with the (phir, thetar, psir) angles of a simulation file.
+    Parameters :
+    - vectors: (N, 3) array of vectors in the body frame
+    - phi, theta, psi: arrays of N roll, pitch and yaw angles in radians
+    - out: optional (N, 3) array where the rotated vectors are written
+    """
+    return np.einsum("nji,nj->ni", dcm_array(phi, theta, psi), vectors, out=out)
@@ -0,0 +1,219 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from loader import get_variable_names, load_simulation
+
+"""
+Fleet store: the selected variables of all the simulated flights packed in a single contiguous
+float32 array, to serve training windows from disk without loading the fleet in memory.
+A store directory holds:
+- data.npy: (nb_rows, nb_columns) float32 array of the variables, flights after flights
+- labels.npy: (nb_rows, nb_labels) int8 array of the labels, 1 where the Turbulence and Icing
+variables are not 0
+- flights.csv: name, first row and number of rows of each flight
+- store.json: columns, label columns, stride, and mean and standard deviation of each column
+over the fleet, to normalize the windows
+The arrays are memory-mapped by FleetStore, the windows are views of the files.
+"""
+
+LABEL_COLUMNS = ("Turbulence", "Icing")
+
+
+def build_fleet_store(
+    simulation_dir_path,
+    store_dir_path,
+    columns,
+    label_columns=LABEL_COLUMNS,
+    stride=1,
+    pattern="*.csv",
+):
+    """
+    Builds a fleet store from the simulation files of a directory, one flight at a time.
+    Parameters :
+    - simulation_dir_path: path of the directory containing the simulation files
+    - store_dir_path: path of the store directory, created if needed
+    - columns: variables stored in data.npy (see loader.get_variable_names)
+    - label_columns: variables stored in labels.npy
+    - stride: only one row every stride rows is stored (see loader.load_simulation)
+    - pattern: glob pattern of the simulation files
+    Returns the FleetStore.
+    """
+    columns = get_variable_names(columns)
+    label_columns = get_variable_names(label_columns)
+    file_paths = sorted(simulation_dir_path.glob(pattern))
+    nb_rows = [-(-_count_data_lines(file_path) // stride) for file_path in file_paths]
+    first_rows = np.concatenate([[0], np.cumsum(nb_rows)[:-1]]).astype(np.int64)
+
+    store_dir_path.mkdir(parents=True, exist_ok=True)
+    data = np.lib.format.open_memmap(
+        store_dir_path / "data.npy",
+        mode="w+",
+        dtype=np.float32,
+        shape=(sum(nb_rows), len(columns)),
+    )
+    labels = np.lib.format.open_memmap(
+        store_dir_path / "labels.npy",
+        mode="w+",
+        dtype=np.int8,
+        shape=(sum(nb_rows), len(label_columns)),
+    )
+    # Sums in float64 over the fleet for the normalization statistics
+    column_sums = np.zeros(len(columns))
+    column_square_sums = np.zeros(len(columns))
+    for file_path, first_row, flight_nb_rows in zip(file_paths, first_rows, nb_rows):
+        flight_data = load_simulation(
+            file_path, columns=columns + label_columns, stride=stride
+        )
+        if flight_data.shape[0] != flight_nb_rows:
+            raise ValueError(
+                f"{file_path}: {flight_data.shape[0]} rows read, {flight_nb_rows} expected"
+            )
+        values = flight_data[columns].to_numpy(dtype=np.float64)
+        data[first_row : first_row + flight_nb_rows] = values
+        labels[first_row : first_row + flight_nb_rows] = (
+            flight_data[label_columns].to_numpy() != 0
+        )
+        column_sums += values.sum(axis=0)
+        column_square_sums += np.square(values).sum(axis=0)
+    data.flush()
+    labels.flush()
+
+    total_nb_rows = max(sum(nb_rows), 1)
+    mean = column_sums / total_nb_rows
+    std = np.sqrt(np.maximum(column_square_sums / total_nb_rows - mean**2, 0))
+    pd.DataFrame(
+        {
+            "flight": [
+                file_path.stem.removesuffix("_simulated") for file_path in file_paths
+            ],
+            "first_row": first_rows,
+            "nb_rows": nb_rows,
+        }
+    ).to_csv(store_dir_path / "flights.csv", index=False)
+    with open(store_dir_path / "store.json", "w") as file:
+        json.dump(
+            {
+                "columns": columns,
+                "label_columns": label_columns,
+                "stride": stride,
+                "mean": mean.tolist(),
+                "std": std.tolist(),
+            },
+            file,
+            indent=2,
+        )
+    return FleetStore(store_dir_path)
+
+
+class FleetStore:
+    """
+    Read access to a fleet store (see build_fleet_store). The arrays are read-only memory maps.
+    Parameters :
+    - store_dir_path: path of the store directory
+    """
+
+    def __init__(self, store_dir_path):
+        with open(store_dir_path / "store.json") as file:
+            metadata = json.load(file)
+        self.columns = metadata["columns"]
+        self.label_columns = metadata["label_columns"]
+        self.stride = metadata["stride"]
+        self.mean = np.array(metadata["mean"], dtype=np.float32)
+        self.std = np.array(metadata["std"], dtype=np.float32)
+        self.data = np.load(store_dir_path / "data.npy", mmap_mode="r")
+        self.labels = np.load(store_dir_path / "labels.npy", mmap_mode="r")
+        self.flights = pd.read_csv(store_dir_path / "flights.csv")
+        self._flight_indexes = {
+            flight: i for i, flight in enumerate(self.flights["flight"])
+        }
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def flight(self, flight):
+        """
+        Returns the (nb_rows, nb_columns) data and (nb_rows, nb_labels) labels views of a
+        flight, given by its name or its index in self.flights.
+        """
+        first_row, nb_rows = self._get_flight_rows(flight)
+        return (
+            self.data[first_row : first_row + nb_rows],
+            self.labels[first_row : first_row + nb_rows],
+        )
+
+    def window(self, flight, start, length):
+        """
+        Returns the (length, nb_columns) data and (length, nb_labels) labels views of the window
+        of a flight starting at its row start. Raises an IndexError if the window is not inside
+        the flight.
+        """
+        first_row, nb_rows = self._get_flight_rows(flight)
+        if start < 0 or start + length > nb_rows:
+            raise IndexError(
+                f"Window [{start}, {start + length}) outside of the {nb_rows} rows of the flight"
+            )
+        return (
+            self.data[first_row + start : first_row + start + length],
+            self.labels[first_row + start : first_row + start + length],
+        )
+
+    def window_starts(self, length, step=1):
+        """
+        Returns the rows of the store where the windows of length rows start, every step rows
+        in each flight. The windows do not overlap two flights.
+        """
+        starts = [
+            first_row + np.arange(0, nb_rows - length + 1, step, dtype=np.int64)
+            for first_row, nb_rows in zip(
+                self.flights["first_row"], self.flights["nb_rows"]
+            )
+        ]
+        return np.concatenate(starts) if starts else np.array([], dtype=np.int64)
+
+    def get_batch(self, starts, length, normalize=True):
+        """
+        Returns the windows of length rows starting at the rows starts of the store (see
+        window_starts), as a (nb_windows, length, nb_columns) float32 array, and their labels
+        (1 if the label is set in at least one row of the window) as a (nb_windows, nb_labels)
+        int8 array. Only the rows of the windows are read from the files.
+        Parameters :
+        - starts: rows of the store where the windows start
+        - length: number of rows of the windows
+        - normalize: if True, the columns are centered and scaled with the fleet statistics
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        rows = starts[:, np.newaxis] + np.arange(length)
+        batch = self.data[rows]
+        if normalize:
+            batch = self.normalize(batch)
+        return batch, self.labels[rows].max(axis=1)
+
+    def normalize(self, values):
+        """
+        Returns the values of the columns centered and scaled with the fleet statistics.
+        """
+        return (values - self.mean) / np.where(self.std > 0, self.std, 1)
+
+    def _get_flight_rows(self, flight):
+        index = self._flight_indexes[flight] if isinstance(flight, str) else flight
+        return (
+            int(self.flights["first_row"].iloc[index]),
+            int(self.flights["nb_rows"].iloc[index]),
+        )
+
+
+def _count_data_lines(file_path, chunk_size=2**24):
+    """
+    Returns the number of lines of a csv file after its header line.
+    """
+    nb_lines = 0
+    last_chunk = b""
+    with open(file_path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            nb_lines += chunk.count(b"\n")
+            last_chunk = chunk
+    if last_chunk and not last_chunk.endswith(b"\n"):
+        nb_lines += 1
+    return max(nb_lines - 1, 0)
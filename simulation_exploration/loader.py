@@ -0,0 +1,133 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from variable_correspondence import VARIABLE_DESCRIPTION
+
+"""
+Loading of the simulation files (<flight>_simulated.csv) written by file_generation.m.
+Only the requested columns are parsed, and the rows are decimated before being parsed: the
+skipped lines are never converted to numbers, which is the main cost of reading the files.
+"""
+
+DESCRIPTION_VARIABLE = {
+    description: variable for variable, description in VARIABLE_DESCRIPTION.items()
+}
+
+
+def get_variable_names(columns):
+    """
+    Returns the variable names (keys of VARIABLE_DESCRIPTION) of columns given by their
+    variable name or their description. Raises a ValueError for unknown columns.
+    """
+    unknown_columns = [
+        column
+        for column in columns
+        if column not in VARIABLE_DESCRIPTION and column not in DESCRIPTION_VARIABLE
+    ]
+    if unknown_columns:
+        raise ValueError(f"Unknown simulation variables: {unknown_columns}")
+    return [DESCRIPTION_VARIABLE.get(column, column) for column in columns]
+
+
+def load_simulation(
+    file_path,
+    columns=None,
+    stride=1,
+    t_range=None,
+    skip_last_row=False,
+    descriptive_names=False,
+):
+    """
+    Loads a simulation file.
+    The index of the returned dataframe is the row number in the file.
+    Parameters :
+    - file_path: path of the simulation file
+    - columns: variables to load, by variable name or description (see VARIABLE_DESCRIPTION).
+    All the columns by default. The time column is always loaded.
+    - stride: only one row every stride rows is loaded (20 for 1 Hz with the 0.05 s step of the
+    simulation)
+    - t_range: (t_min, t_max) bounds in seconds of the loaded rows, None for the whole flight
+    - skip_last_row: if True, the last row of the file is not loaded
+    - descriptive_names: if True, the columns are renamed with VARIABLE_DESCRIPTION
+    """
+    usecols = None
+    if columns is not None:
+        usecols = get_variable_names(columns)
+        if "time" not in usecols:
+            usecols.insert(0, "time")
+    if stride == 1:
+        data = pd.read_csv(file_path, usecols=usecols)
+        if skip_last_row:
+            data = data.iloc[:-1]
+    else:
+        data = pd.read_csv(
+            io.StringIO(_read_decimated_lines(file_path, stride, skip_last_row)),
+            usecols=usecols,
+        )
+    if usecols is not None:
+        data = data[usecols]
+    data.index = np.arange(data.shape[0]) * stride
+    if t_range is not None:
+        data = data[(data["time"] >= t_range[0]) & (data["time"] <= t_range[1])]
+    if descriptive_names:
+        data = data.rename(columns=VARIABLE_DESCRIPTION)
+    return data
+
+
+def _read_decimated_lines(file_path, stride, skip_last_row):
+    """
+    Returns the header line and one data line every stride lines of a csv file, as a string.
+    """
+    with open(file_path) as file:
+        header = file.readline()
+        kept_lines = list()
+        row = -1
+        for row, line in enumerate(file):
+            if row % stride == 0:
+                kept_lines.append(line)
+    if skip_last_row and row >= 0 and row % stride == 0:
+        kept_lines.pop()
+    return header + "".join(kept_lines)
+
+
+def load_fleet(
+    dir_path,
+    columns=None,
+    stride=1,
+    t_range=None,
+    skip_last_row=False,
+    descriptive_names=False,
+    pattern="*.csv",
+    workers=4,
+):
+    """
+    Loads all the simulation files of a directory into a single dataframe, with a “file_name”
+    column. The files are read by workers threads and concatenated once.
+    Parameters :
+    - dir_path: path of the directory containing the simulation files
+    - pattern: glob pattern of the simulation files
+    - workers: number of threads reading the files
+    The other parameters are described in load_simulation.
+    """
+    file_paths = sorted(dir_path.glob(pattern))
+
+    def load_file(file_path):
+        data = load_simulation(
+            file_path,
+            columns=columns,
+            stride=stride,
+            t_range=t_range,
+            skip_last_row=skip_last_row,
+            descriptive_names=descriptive_names,
+        )
+        data["file_name"] = file_path.name
+        return data
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fleet_data = list(executor.map(load_file, file_paths))
+    if not fleet_data:
+        return pd.DataFrame()
+    return pd.concat(fleet_data, axis=0)
@@ -0,0 +1,100 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from turbulence_io import FILE_EXTENSIONS, read_table, write_table
+
+"""
+Compares the size and the load time of the generated files in the csv and binary formats.
+Usage: python benchmark_file_formats.py [--duration 3600] [--frequency 100] [--repeat 3]
+"""
+
+BENCHMARKED_FORMATS = (
+    ("csv", np.float64),
+    ("npy", np.float64),
+    ("npy", np.float32),
+    ("bin", np.float64),
+    ("bin", np.float32),
+)
+
+
+def create_benchmark_table(duration, sampling_frequency, seed=0):
+    """
+    Returns a dataframe with the layout of a turbulence file, filled with random values.
+    Parameters :
+    - duration: duration of the table in seconds
+    - sampling_frequency: sampling frequency in Hz
+    - seed: seed of the random values
+    """
+    rng = np.random.default_rng(seed)
+    nb_samples = duration * sampling_frequency
+    df = pd.DataFrame(
+        rng.standard_normal((nb_samples, 6)), columns=["u", "v", "w", "p", "q", "r"]
+    )
+    df.insert(0, "turbulence", (rng.random(nb_samples) < 0.05).astype(float))
+    df.insert(0, "timestamp", np.around(np.arange(nb_samples) / sampling_frequency, 6))
+    return df
+
+
+def benchmark_file_formats(duration=3600, sampling_frequency=100, repeat=3):
+    """
+    Writes the same table in each format and returns a dataframe with the file size and the
+    best load time (full read into memory, and memory-mapped read of one column).
+    """
+    df = create_benchmark_table(duration, sampling_frequency)
+    results = list()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_format, dtype in BENCHMARKED_FORMATS:
+            file_path = Path(tmp_dir) / (
+                f"table_{np.dtype(dtype).name}" + FILE_EXTENSIONS[file_format]
+            )
+            write_table(df, file_path, file_format=file_format, dtype=dtype)
+            load_time = _best_time(
+                lambda: read_table(file_path, mmap=False).to_numpy(), repeat
+            )
+            if file_format == "csv":
+                mmap_time = np.nan
+            else:
+                mmap_time = _best_time(
+                    lambda: read_table(file_path)["w"].to_numpy(copy=True), repeat
+                )
+            results.append(
+                {
+                    "format": file_format,
+                    "dtype": np.dtype(dtype).name,
+                    "size_MB": file_path.stat().st_size / 1e6,
+                    "load_s": load_time,
+                    "mmap_column_s": mmap_time,
+                }
+            )
+    results = pd.DataFrame(results)
+    results["load_speedup"] = results["load_s"].iloc[0] / results["load_s"]
+    return results
+
+
+def _best_time(function, repeat):
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Size and load time of the csv and binary file formats"
+    )
+    parser.add_argument("--duration", type=int, default=3600, help="seconds")
+    parser.add_argument("--frequency", type=int, default=100, help="Hz")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(
+        benchmark_file_formats(args.duration, args.frequency, args.repeat).to_string(
+            index=False, float_format="%.3f"
+        )
+    )
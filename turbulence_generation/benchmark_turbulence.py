@@ -0,0 +1,787 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from turbulence_generator import (
+    SPECTRA_FUNCTIONS,
+    SYNTHESIS_BATCH_SIZE,
+    compute_spectra_magnitudes,
+    create_calm_conditions_complete_flight,
+    create_turbulence_complete_flight,
+    create_turbulence_df,
+    create_turbulence_file,
+    create_turbulence_files,
+    generate_3d_turbulence,
+    generate_perfect_spectra_noise,
+    generate_turbulence_batch,
+    generate_turbulence_times,
+    get_flight_duration,
+    get_segment_rng,
+    get_turbulence_parameters,
+    get_turbulence_parameters_array,
+    get_turbulence_segments,
+    iter_turbulence_complete_flight,
+    merge_turbulence_and_noturbulence,
+    time_index,
+    turbulence_window,
+)
+from turbulence_filters import FilteredTurbulenceGenerator, iter_filtered_turbulence
+from turbulence_io import read_table
+from turbulence_parameters import (
+    turbulence_bandwidth,
+    turbulence_bandwidth_array,
+    turbulence_scale_length,
+    turbulence_scale_length_array,
+    turbulence_std,
+    turbulence_std_array,
+)
+from turbulence_spectra import f_w, spectra_magnitudes
+
+"""
+Benchmark of the turbulence generation pipeline on synthetic flight plans.
+Each case (function, flight duration, sampling frequency) runs in a fresh process, so that the
+peak resident memory of a case is not hidden by the previous ones. The results are printed and
+saved in a JSON file, which can be compared with the results of another commit.
+Usage: python benchmark_turbulence.py [--durations 300 3600 43200] [--frequencies 25 40 100]
+[--benchmarks create_turbulence_complete_flight ...] [--output results.json]
+[--compare previous_results.json]
+"""
+
+PLANE_PARAMETERS = {"b": 13.16}
+DEFAULT_DURATIONS = (300, 3600, 12 * 3600)
+DEFAULT_FREQUENCIES = (25, 40, 100)
+# Duration of the flight excerpts where the setups check the equivalences between generation
+# paths, in seconds, and number of flights of the file generation checks
+CHECK_DURATION = 600
+CHECK_NB_FLIGHTS = 3
+# Windows (start and end times in seconds) compared with the rows of a turbulence file
+CHECK_WINDOWS = ((0, 45.5), (100.25, 317), (CHECK_DURATION - 50, CHECK_DURATION))
+# Duration of the turbulence whose standard deviations are compared between the filtered and
+# the spectral generations, in seconds, and relative tolerance on their ratio
+CHECK_SCALE_DURATION = 3600
+CHECK_SCALE_RTOL = 0.15
+# Durations (s) and turbulence levels of the segments synthesized by batches, several of the
+# same size
+CHECK_BATCH_SEGMENTS = ((60, 2), (60, 0), (37, 3), (60, 1), (37, 0), (60, 2))
+# Duration of the calm intervals of create_calm_conditions_complete_flight with its default
+# parameters (parameter actualisation period and transition), in seconds
+CALM_INTERVAL_DURATION = 183
+
+
+def create_synthetic_flight_plan(duration, seed=0):
+    """
+    Returns a flight plan with the columns of example_data/flight_plans/example_flight.csv, one
+    row per second: a climb from 300 m to 6000 m, a cruise and a descent, with noisy speed and
+    heading.
+    Parameters :
+    - duration: flight duration in seconds
+    - seed: seed of the noise
+    """
+    rng = np.random.default_rng(seed)
+    timestamp = np.arange(duration)
+    phase_duration = min(1200, duration / 3)
+    altitude = np.interp(
+        timestamp,
+        [0, phase_duration, duration - phase_duration, duration],
+        [300, 6000, 6000, 300],
+    )
+    speed = np.interp(
+        timestamp,
+        [0, phase_duration, duration - phase_duration, duration],
+        [70, 110, 110, 70],
+    )
+    return pd.DataFrame(
+        {
+            "timestamp": timestamp,
+            "datetime": pd.Timestamp("2011-11-08 14:44:01")
+            + pd.to_timedelta(timestamp, unit="s"),
+            "platform_course : from INS (degree)": (
+                143 + np.cumsum(rng.normal(0, 0.1, duration))
+            )
+            % 360,
+            "altitude : from GPS (meter)": altitude + rng.normal(0, 2, duration),
+            "platform_speed_wrt_air : from pitot (m/s)": speed
+            + rng.normal(0, 1, duration),
+        }
+    )
+
+
+def _setup_generate_perfect_spectra_noise(safire_data, sampling_frequency):
+    N = len(safire_data) * sampling_frequency
+    turbulence_parameters = _mean_turbulence_parameters(safire_data, sampling_frequency)
+    return lambda: generate_perfect_spectra_noise(
+        N,
+        sampling_frequency,
+        turbulence_parameters["bandwidth"],
+        f_w,
+        turbulence_parameters,
+        rng=0,
+    )
+
+
+def _setup_compute_spectra_magnitudes(safire_data, sampling_frequency):
+    N = len(safire_data) * sampling_frequency
+    turbulence_parameters = _mean_turbulence_parameters(safire_data, sampling_frequency)
+    # The fused kernel must give the spectra of the f_* functions
+    omegas = 2 * np.pi * np.fft.rfftfreq(N, 1 / sampling_frequency)[1:]
+    expected = np.array(
+        [function(omegas, turbulence_parameters) for function in SPECTRA_FUNCTIONS]
+    )
+    if not np.allclose(
+        spectra_magnitudes(omegas, turbulence_parameters), expected, rtol=1e-12, atol=0
+    ):
+        raise AssertionError("spectra_magnitudes differs from the f_* functions")
+    return lambda: compute_spectra_magnitudes(
+        N,
+        sampling_frequency,
+        turbulence_parameters["bandwidth"],
+        SPECTRA_FUNCTIONS,
+        turbulence_parameters,
+    )
+
+
+def _setup_get_turbulence_parameters_array(safire_data, sampling_frequency):
+    # The array functions must give the values of the scalar functions
+    rng = np.random.default_rng(0)
+    m2feet = 3.28084
+    band_edges = np.array([1000, 2000]) / m2feet
+    h = np.concatenate(
+        [
+            rng.uniform(-50, 12000, 1000),
+            [-10, 0, 1],
+            band_edges,
+            np.nextafter(band_edges, 0),
+            np.nextafter(band_edges, np.inf),
+        ]
+    )
+    v = rng.uniform(50, 250, h.shape)
+    levels = [np.full(h.shape, level) for level in range(4)]
+    # Mixed levels, as floats as read from a csv file
+    levels.append(rng.integers(0, 4, h.shape).astype(float))
+    expected_lengths = np.array([turbulence_scale_length(h_m) for h_m in h]).T
+    expected_bandwidths = [turbulence_bandwidth(h_m, v_i) for h_m, v_i in zip(h, v)]
+    if not np.allclose(
+        turbulence_scale_length_array(h), expected_lengths, rtol=1e-12, atol=0
+    ) or not np.allclose(
+        turbulence_bandwidth_array(h, v), expected_bandwidths, rtol=1e-12, atol=0
+    ):
+        raise AssertionError(
+            "turbulence_scale_length_array or turbulence_bandwidth_array differs from the "
+            "scalar functions"
+        )
+    for level in levels:
+        expected_stds = np.array(
+            [turbulence_std(h_m, int(level_i)) for h_m, level_i in zip(h, level)]
+        ).T
+        if not np.allclose(
+            turbulence_std_array(h, level), expected_stds, rtol=1e-12, atol=0
+        ):
+            raise AssertionError("turbulence_std_array differs from turbulence_std")
+    return lambda: get_turbulence_parameters_array(
+        safire_data["platform_speed_wrt_air : from pitot (m/s)"].to_numpy(),
+        safire_data["altitude : from GPS (meter)"].to_numpy(),
+        PLANE_PARAMETERS,
+        sampling_frequency,
+        2,
+    )
+
+
+def _setup_create_turbulence_df(safire_data, sampling_frequency):
+    turbulence_parameters = _mean_turbulence_parameters(safire_data, sampling_frequency)
+    return lambda: create_turbulence_df(
+        turbulence_parameters["V"],
+        turbulence_parameters["h"],
+        PLANE_PARAMETERS,
+        0,
+        len(safire_data),
+        sampling_frequency,
+        True,
+        rng=0,
+    )
+
+
+def _setup_generate_turbulence_batch(safire_data, sampling_frequency):
+    # Each segment must be the data of create_turbulence_df with the same conditions and rng,
+    # also when the segments of the same size are split between several batches
+    turbulence_parameters = _mean_turbulence_parameters(safire_data, sampling_frequency)
+    requests = [
+        (
+            turbulence_parameters["V"] + 10 * i,
+            turbulence_parameters["h"],
+            duration * sampling_frequency,
+            turbulence_level,
+            i,
+        )
+        for i, (duration, turbulence_level) in enumerate(CHECK_BATCH_SEGMENTS)
+    ]
+    for max_batch_size in (2, SYNTHESIS_BATCH_SIZE):
+        signals = generate_turbulence_batch(
+            requests,
+            PLANE_PARAMETERS,
+            sampling_frequency,
+            max_batch_size=max_batch_size,
+        )
+        for (v, h, N, turbulence_level, rng), signal in zip(requests, signals):
+            turbulence_data = create_turbulence_df(
+                v,
+                h,
+                PLANE_PARAMETERS,
+                0,
+                N // sampling_frequency,
+                sampling_frequency,
+                turbulence_level != 0,
+                turbulence_level=turbulence_level,
+                rng=rng,
+            )
+            if not np.array_equal(
+                signal, turbulence_data[["u", "v", "w", "p", "q", "r"]].to_numpy()
+            ):
+                raise AssertionError(
+                    "generate_turbulence_batch differs from create_turbulence_df"
+                )
+    # The calm intervals of the flight
+    requests = [
+        (
+            turbulence_parameters["V"],
+            turbulence_parameters["h"],
+            CALM_INTERVAL_DURATION * sampling_frequency,
+            0,
+            i,
+        )
+        for i in range(len(safire_data) // CALM_INTERVAL_DURATION)
+    ]
+    return lambda: generate_turbulence_batch(
+        requests, PLANE_PARAMETERS, sampling_frequency
+    )
+
+
+def _setup_create_turbulence_complete_flight(safire_data, sampling_frequency):
+    # The array path must give the turbulence of the segments of create_turbulence_df merged by
+    # merge_turbulence_and_noturbulence
+    excerpt = safire_data.iloc[:CHECK_DURATION]
+    turbulence_data = create_turbulence_complete_flight(
+        excerpt,
+        PLANE_PARAMETERS,
+        turbulence_mean_length=60,
+        turbulence_part=0.3,
+        sampling_frequency=sampling_frequency,
+        rng=0,
+    )
+    expected_data = _merge_turbulence_df_segments(
+        excerpt, 60, 0.3, sampling_frequency, rng=0
+    )
+    if not (
+        turbulence_data.index.equals(expected_data.index)
+        and turbulence_data.columns.equals(expected_data.columns)
+        and np.array_equal(turbulence_data.to_numpy(), expected_data.to_numpy())
+    ):
+        raise AssertionError(
+            "create_turbulence_complete_flight differs from the merged segments"
+        )
+    return lambda: create_turbulence_complete_flight(
+        safire_data, PLANE_PARAMETERS, sampling_frequency=sampling_frequency, rng=0
+    )
+
+
+def _setup_iter_turbulence_complete_flight(safire_data, sampling_frequency):
+    # The concatenated blocks must be the turbulence of the complete flight, with block
+    # boundaries inside segments and transitions
+    excerpt = safire_data.iloc[:CHECK_DURATION]
+    parameters = {
+        "turbulence_mean_length": 60,
+        "turbulence_part": 0.3,
+        "sampling_frequency": sampling_frequency,
+        "rng": 0,
+        "max_segment_duration": 120,
+    }
+    blocks = pd.concat(
+        iter_turbulence_complete_flight(
+            excerpt, PLANE_PARAMETERS, block_duration=47, **parameters
+        )
+    )
+    turbulence_data = create_turbulence_complete_flight(
+        excerpt, PLANE_PARAMETERS, **parameters
+    )
+    if not (
+        blocks.index.equals(turbulence_data.index)
+        and np.array_equal(blocks.to_numpy(), turbulence_data.to_numpy())
+    ):
+        raise AssertionError(
+            "The blocks of iter_turbulence_complete_flight differ from the complete flight"
+        )
+
+    def consume_blocks():
+        for block in iter_turbulence_complete_flight(
+            safire_data, PLANE_PARAMETERS, sampling_frequency=sampling_frequency, rng=0
+        ):
+            pass
+
+    return consume_blocks
+
+
+def _setup_iter_filtered_turbulence(safire_data, sampling_frequency):
+    # The filtered turbulence has the standard deviations of MIL-HDBK-1797A, the spectral one
+    # sqrt(V / (pi * fs)) times them (see the turbulence_filters module description). The
+    # channels q and r, and p at high frequency, are band-limited by the spectral generation.
+    turbulence_parameters = _mean_turbulence_parameters(safire_data, sampling_frequency)
+    nb_samples = CHECK_SCALE_DURATION * sampling_frequency
+    spectral_turbulence = generate_3d_turbulence(
+        nb_samples, sampling_frequency, turbulence_parameters, rng=0
+    )
+    generator = FilteredTurbulenceGenerator(PLANE_PARAMETERS, sampling_frequency, rng=0)
+    generator.update(turbulence_parameters["V"], turbulence_parameters["h"])
+    filtered_turbulence = generator.generate(nb_samples)
+    ratios = filtered_turbulence[:, :3].std(axis=0) / spectral_turbulence[:, :3].std(
+        axis=0
+    )
+    expected_ratio = np.sqrt(np.pi * sampling_frequency / turbulence_parameters["V"])
+    if not np.allclose(ratios, expected_ratio, rtol=CHECK_SCALE_RTOL):
+        raise AssertionError(
+            f"Filtered / spectral standard deviations {ratios}, {expected_ratio} expected"
+        )
+
+    def consume_blocks():
+        for block in iter_filtered_turbulence(
+            safire_data, PLANE_PARAMETERS, sampling_frequency=sampling_frequency, rng=0
+        ):
+            pass
+
+    return consume_blocks
+
+
+def _setup_create_turbulence_complete_flight_float32(safire_data, sampling_frequency):
+    # The float32 turbulence must keep the standard deviations and the power spectral densities
+    # of the float64 turbulence, checked on the first minutes to keep the setup memory low
+    excerpt = safire_data.iloc[:CHECK_DURATION]
+    turbulence_data = {
+        dtype: create_turbulence_complete_flight(
+            excerpt,
+            PLANE_PARAMETERS,
+            sampling_frequency=sampling_frequency,
+            rng=0,
+            dtype=dtype,
+        )
+        for dtype in (np.float64, np.float32)
+    }
+    (sigma64, psd64), (sigma32, psd32) = [
+        _spectral_statistics(turbulence_data[dtype], sampling_frequency)
+        for dtype in (np.float64, np.float32)
+    ]
+    significant = psd64 > 1e-6 * psd64.max(axis=0)
+    if not np.allclose(sigma32, sigma64, rtol=1e-4, atol=0) or not np.allclose(
+        psd32[significant], psd64[significant], rtol=1e-3, atol=0
+    ):
+        raise AssertionError("The float32 turbulence statistics differ from float64")
+    # The merge step must keep the float32 turbulence in float32
+    turbulence_start_times, turbulence_durations = generate_turbulence_times(
+        len(excerpt), 180, 0.05, rng=0
+    )
+    merged_data = merge_turbulence_and_noturbulence(
+        turbulence_data[np.float32],
+        create_calm_conditions_complete_flight(
+            excerpt,
+            PLANE_PARAMETERS,
+            sampling_frequency=sampling_frequency,
+            rng=1,
+            dtype=np.float32,
+        ),
+        turbulence_start_times,
+        turbulence_durations,
+        3,
+        sampling_frequency,
+    )
+    if not (merged_data.dtypes == np.float32).all():
+        raise AssertionError("merge_turbulence_and_noturbulence does not keep float32")
+    return lambda: create_turbulence_complete_flight(
+        safire_data,
+        PLANE_PARAMETERS,
+        sampling_frequency=sampling_frequency,
+        rng=0,
+        dtype=np.float32,
+    )
+
+
+def _setup_create_turbulence_files(safire_data, sampling_frequency):
+    # The files must not depend on the number of workers
+    with tempfile.TemporaryDirectory() as check_dir:
+        check_dir_path = Path(check_dir)
+        instruction_dir_path = check_dir_path / "instructions"
+        instruction_dir_path.mkdir()
+        for flight in range(CHECK_NB_FLIGHTS):
+            safire_data.iloc[:CHECK_DURATION].to_csv(
+                instruction_dir_path / f"flight_{flight}.csv", index=False
+            )
+        file_contents = list()
+        for workers in (1, 2):
+            turbulence_dir_path = check_dir_path / f"workers_{workers}"
+            turbulence_dir_path.mkdir()
+            create_turbulence_files(
+                instruction_dir_path,
+                turbulence_dir_path,
+                PLANE_PARAMETERS,
+                sampling_frequency=sampling_frequency,
+                workers=workers,
+                seed=0,
+            )
+            file_contents.append(
+                {
+                    file_path.name: file_path.read_bytes()
+                    for file_path in turbulence_dir_path.iterdir()
+                }
+            )
+        if (
+            len(file_contents[0]) != CHECK_NB_FLIGHTS
+            or file_contents[0] != file_contents[1]
+        ):
+            raise AssertionError("The turbulence files depend on the number of workers")
+    # Removed when the benchmark process exits
+    work_dir = tempfile.TemporaryDirectory()
+    instruction_file_path = Path(work_dir.name) / "flight.csv"
+    safire_data.to_csv(instruction_file_path, index=False)
+    return lambda: create_turbulence_file(
+        instruction_file_path,
+        Path(work_dir.name) / "flight_turbwind.csv",
+        PLANE_PARAMETERS,
+        sampling_frequency=sampling_frequency,
+        seed=0,
+    )
+
+
+def _setup_turbulence_window(safire_data, sampling_frequency):
+    # The windows must be the matching rows of the turbulence file, also across the turbulence
+    # boundaries
+    parameters = {
+        "turbulence_mean_length": 60,
+        "turbulence_part": 0.3,
+        "sampling_frequency": sampling_frequency,
+    }
+    with tempfile.TemporaryDirectory() as check_dir:
+        instruction_file_path = Path(check_dir) / "flight.csv"
+        safire_data.iloc[:CHECK_DURATION].to_csv(instruction_file_path, index=False)
+        turb_file_path = Path(check_dir) / "flight_turbwind.npy"
+        create_turbulence_file(
+            instruction_file_path,
+            turb_file_path,
+            PLANE_PARAMETERS,
+            seed=0,
+            file_format="npy",
+            **parameters,
+        )
+        turbulence_data = read_table(turb_file_path, mmap=False)
+        for start_time, end_time in CHECK_WINDOWS:
+            window = turbulence_window(
+                instruction_file_path,
+                PLANE_PARAMETERS,
+                0,
+                start_time,
+                end_time,
+                **parameters,
+            )
+            timestamps = turbulence_data["timestamp"]
+            rows = turbulence_data[(timestamps >= start_time) & (timestamps < end_time)]
+            if not window.equals(rows.reset_index(drop=True)):
+                raise AssertionError(
+                    f"turbulence_window({start_time}, {end_time}) differs from the file rows"
+                )
+    # Removed when the benchmark process exits
+    work_dir = tempfile.TemporaryDirectory()
+    instruction_file_path = Path(work_dir.name) / "flight.csv"
+    safire_data.to_csv(instruction_file_path, index=False)
+    start_time = get_flight_duration(safire_data) // 2
+    return lambda: turbulence_window(
+        Path(work_dir.name) / "flight.csv",
+        PLANE_PARAMETERS,
+        0,
+        start_time,
+        start_time + 60,
+        sampling_frequency=sampling_frequency,
+    )
+
+
+def _setup_create_calm_conditions_complete_flight(safire_data, sampling_frequency):
+    return lambda: create_calm_conditions_complete_flight(
+        safire_data, PLANE_PARAMETERS, sampling_frequency=sampling_frequency, rng=0
+    )
+
+
+def _setup_merge_turbulence_and_noturbulence(safire_data, sampling_frequency):
+    rng = np.random.default_rng(0)
+    flight_duration = len(safire_data)
+    turbulence_start_times, turbulence_durations = generate_turbulence_times(
+        flight_duration, 180, 0.05, rng=rng
+    )
+    columns = ["u", "v", "w", "p", "q", "r"]
+    nb_samples = flight_duration * sampling_frequency
+    turb_data = pd.DataFrame(rng.standard_normal((nb_samples, 6)), columns=columns)
+    turb_data["turbulence"] = 0.0
+    for start_time, duration in zip(turbulence_start_times, turbulence_durations):
+        turb_data.iloc[
+            start_time
+            * sampling_frequency : (start_time + duration)
+            * sampling_frequency,
+            6,
+        ] = 1.0
+    no_turb_data = pd.DataFrame(rng.standard_normal((nb_samples, 6)), columns=columns)
+    return lambda: merge_turbulence_and_noturbulence(
+        turb_data,
+        no_turb_data,
+        turbulence_start_times,
+        turbulence_durations,
+        3,
+        sampling_frequency,
+    )
+
+
+def _merge_turbulence_df_segments(
+    safire_data, turbulence_mean_length, turbulence_part, sampling_frequency, rng
+):
+    """
+    Returns the turbulence of create_turbulence_complete_flight (default transition duration and
+    turbulence level) computed with dataframes: the segments are generated by
+    create_turbulence_df, written in the turbulence and non-turbulence dataframes by index
+    alignment, then merged by merge_turbulence_and_noturbulence.
+    """
+    transition_duration = 3
+    rng = np.random.default_rng(rng)
+    flight_duration = get_flight_duration(safire_data)
+    turbulence_start_times, turbulence_durations = generate_turbulence_times(
+        flight_duration, turbulence_mean_length, turbulence_part, rng=rng
+    )
+    turb_data = pd.DataFrame(
+        index=time_index(0, flight_duration * sampling_frequency, sampling_frequency),
+        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+        data=0.0,
+    )
+    no_turb_data = turb_data.copy()
+    for segment_index, segment in enumerate(
+        get_turbulence_segments(
+            safire_data,
+            flight_duration,
+            turbulence_start_times,
+            turbulence_durations,
+            transition_duration,
+        )
+    ):
+        segment_data = create_turbulence_df(
+            segment["v"],
+            segment["h"],
+            PLANE_PARAMETERS,
+            segment["start"],
+            segment["duration"],
+            sampling_frequency,
+            segment["is_turbulence"],
+            rng=get_segment_rng(rng, segment_index),
+        )
+        (turb_data if segment["is_turbulence"] else no_turb_data).update(segment_data)
+    return merge_turbulence_and_noturbulence(
+        turb_data,
+        no_turb_data,
+        turbulence_start_times,
+        turbulence_durations,
+        transition_duration,
+        sampling_frequency,
+    )
+
+
+def _spectral_statistics(turbulence_data, sampling_frequency):
+    """
+    Returns the standard deviations of the u, v, w, p, q and r columns and their power spectral
+    densities averaged over segments of 10 seconds, computed in float64.
+    """
+    values = turbulence_data[["u", "v", "w", "p", "q", "r"]].to_numpy(dtype=np.float64)
+    segment_size = 10 * sampling_frequency
+    nb_segments = len(values) // segment_size
+    segments = values[: nb_segments * segment_size].reshape(
+        nb_segments, segment_size, 6
+    )
+    psd = np.mean(np.abs(np.fft.rfft(segments, axis=1)) ** 2, axis=0)
+    return values.std(axis=0), psd / (segment_size * sampling_frequency)
+
+
+def _mean_turbulence_parameters(safire_data, sampling_frequency):
+    v = safire_data["platform_speed_wrt_air : from pitot (m/s)"].mean()
+    h = safire_data["altitude : from GPS (meter)"].mean()
+    turbulence_parameters = get_turbulence_parameters(
+        v, h, PLANE_PARAMETERS, sampling_frequency, 2
+    )
+    turbulence_parameters["h"] = h
+    return turbulence_parameters
+
+
+BENCHMARKS = {
+    "generate_perfect_spectra_noise": _setup_generate_perfect_spectra_noise,
+    "compute_spectra_magnitudes": _setup_compute_spectra_magnitudes,
+    "get_turbulence_parameters_array": _setup_get_turbulence_parameters_array,
+    "create_turbulence_df": _setup_create_turbulence_df,
+    "generate_turbulence_batch": _setup_generate_turbulence_batch,
+    "create_turbulence_complete_flight": _setup_create_turbulence_complete_flight,
+    "iter_turbulence_complete_flight": _setup_iter_turbulence_complete_flight,
+    "create_turbulence_complete_flight_float32": (
+        _setup_create_turbulence_complete_flight_float32
+    ),
+    "iter_filtered_turbulence": _setup_iter_filtered_turbulence,
+    "create_turbulence_files": _setup_create_turbulence_files,
+    "turbulence_window": _setup_turbulence_window,
+    "create_calm_conditions_complete_flight": _setup_create_calm_conditions_complete_flight,
+    "merge_turbulence_and_noturbulence": _setup_merge_turbulence_and_noturbulence,
+}
+
+
+def run_benchmark_case(benchmark, duration, sampling_frequency, repeat=1):
+    """
+    Runs a benchmark case in the current process and returns its results: best wall time over
+    repeat runs, resident memory after the setup and peak resident memory of the process (MB),
+    and generated samples per second.
+    """
+    warnings.simplefilter("ignore", FutureWarning)  # Keeps the report readable
+    safire_data = create_synthetic_flight_plan(duration)
+    function = BENCHMARKS[benchmark](safire_data, sampling_frequency)
+    setup_rss = _max_rss_mb()
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    nb_samples = duration * sampling_frequency
+    return {
+        "benchmark": benchmark,
+        "duration_s": duration,
+        "sampling_frequency": sampling_frequency,
+        "nb_samples": nb_samples,
+        "wall_time_s": min(times),
+        "setup_rss_MB": setup_rss,
+        "peak_rss_MB": _max_rss_mb(),
+        "samples_per_s": nb_samples / min(times),
+    }
+
+
+def run_benchmarks(
+    benchmarks=tuple(BENCHMARKS),
+    durations=DEFAULT_DURATIONS,
+    frequencies=DEFAULT_FREQUENCIES,
+    repeat=1,
+):
+    """
+    Runs every (benchmark, duration, sampling frequency) case in its own process and returns the
+    list of the results of run_benchmark_case.
+    """
+    results = list()
+    for benchmark in benchmarks:
+        for duration in durations:
+            for sampling_frequency in frequencies:
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    result = executor.submit(
+                        run_benchmark_case,
+                        benchmark,
+                        duration,
+                        sampling_frequency,
+                        repeat,
+                    ).result()
+                print(
+                    f"{benchmark} {duration} s {sampling_frequency} Hz: "
+                    f"{result['wall_time_s']:.3f} s, {result['peak_rss_MB']:.0f} MB, "
+                    f"{result['samples_per_s']:.3g} samples/s"
+                )
+                results.append(result)
+    return results
+
+
+def save_results(results, file_path):
+    """
+    Saves the results in a JSON file, with the commit, the date and the library versions.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    with open(file_path, "w") as file:
+        json.dump(
+            {
+                "commit": commit,
+                "date": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+
+
+def compare_results(results, reference_file_path):
+    """
+    Returns a dataframe comparing the results with the results saved in reference_file_path. A
+    time ratio above 1 means that the current version is slower.
+    """
+    with open(reference_file_path) as file:
+        reference = pd.DataFrame(json.load(file)["results"])
+    keys = ["benchmark", "duration_s", "sampling_frequency"]
+    comparison = pd.DataFrame(results).merge(
+        reference, on=keys, suffixes=("", "_reference")
+    )
+    comparison["time_ratio"] = (
+        comparison["wall_time_s"] / comparison["wall_time_s_reference"]
+    )
+    comparison["peak_rss_ratio"] = (
+        comparison["peak_rss_MB"] / comparison["peak_rss_MB_reference"]
+    )
+    return comparison[
+        keys + ["wall_time_s", "wall_time_s_reference", "time_ratio", "peak_rss_ratio"]
+    ]
+
+
+def _max_rss_mb():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the turbulence generation pipeline"
+    )
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    parser.add_argument(
+        "--durations", nargs="+", type=int, default=DEFAULT_DURATIONS, help="seconds"
+    )
+    parser.add_argument(
+        "--frequencies", nargs="+", type=int, default=DEFAULT_FREQUENCIES, help="Hz"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--compare", type=Path, help="JSON results of a previous run")
+    args = parser.parse_args()
+    results = run_benchmarks(
+        args.benchmarks, args.durations, args.frequencies, args.repeat
+    )
+    save_results(results, args.output)
+    if args.compare is not None:
+        print(
+            compare_results(results, args.compare).to_string(
+                index=False, float_format="%.3f"
+            )
+        )
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+"""
+Build manifest of the generated files.
+For each output file, the manifest records the hash of the content of its input file (flight
+plan), the generation parameters, the seed, the version of the generation code and whether the
+generation completed. An output is up to date when it was completed with the current input
+content, parameters, seed and code version, and still has the size it had when completed. The
+file generation functions (create_turbulence_files, create_calm_conditions_files,
+create_icing_time_files) then only regenerate the stale outputs.
+The manifest is a SQLite database. The content hashes of the input files are cached with their
+size and modification time, so that the unchanged inputs are not read again on reruns.
+"""
+
+STARTED = "started"
+DONE = "done"
+
+
+class BuildManifest:
+    """
+    SQLite build manifest. Can be used as a context manager closing the database.
+    Parameters :
+    - manifest_path: path of the database file, created if needed
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = Path(manifest_path)
+        self._connection = sqlite3.connect(self.manifest_path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS outputs ("
+                "output_path TEXT PRIMARY KEY, input_path TEXT, input_hash TEXT, "
+                "parameters TEXT, seed TEXT, code_version TEXT, status TEXT, "
+                "output_size INTEGER, updated_at TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS input_hashes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def file_hash(self, file_path):
+        """
+        Returns the sha256 hash of the content of a file. The hash is only computed again when
+        the size or the modification time of the file changed.
+        """
+        file_path = Path(file_path).resolve()
+        stat = file_path.stat()
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, hash FROM input_hashes WHERE path = ?",
+            (str(file_path),),
+        ).fetchone()
+        if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+            return row[2]
+        content_hash = _sha256_file(file_path)
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO input_hashes VALUES (?, ?, ?, ?)",
+                (str(file_path), stat.st_size, stat.st_mtime_ns, content_hash),
+            )
+        return content_hash
+
+    def is_up_to_date(self, output_path, input_path, parameters, seed, code_version):
+        """
+        Returns True if output_path was completed from the current content of input_path with
+        the same parameters (JSON serializable dictionary), seed and code_version, and was not
+        modified since.
+        """
+        output_path = Path(output_path).resolve()
+        row = self._connection.execute(
+            "SELECT input_hash, parameters, seed, code_version, status, output_size "
+            "FROM outputs WHERE output_path = ?",
+            (str(output_path),),
+        ).fetchone()
+        if row is None or row[4] != DONE or not output_path.exists():
+            return False
+        return row == (
+            self.file_hash(input_path),
+            _to_json(parameters),
+            _to_json(seed),
+            code_version,
+            DONE,
+            output_path.stat().st_size,
+        )
+
+    def mark_started(self, output_path, input_path, parameters, seed, code_version):
+        """
+        Records that the generation of output_path started. Until mark_done is called, the
+        output is stale, even if the file exists.
+        """
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)",
+                (
+                    str(Path(output_path).resolve()),
+                    str(Path(input_path).resolve()),
+                    self.file_hash(input_path),
+                    _to_json(parameters),
+                    _to_json(seed),
+                    code_version,
+                    STARTED,
+                    _now(),
+                ),
+            )
+
+    def mark_done(self, output_path):
+        """
+        Records that output_path was completely written.
+        """
+        output_path = Path(output_path).resolve()
+        with self._connection:
+            self._connection.execute(
+                "UPDATE outputs SET status = ?, output_size = ?, updated_at = ? "
+                "WHERE output_path = ?",
+                (DONE, output_path.stat().st_size, _now(), str(output_path)),
+            )
+
+    def status(self):
+        """
+        Returns the number of outputs per status.
+        """
+        return dict(
+            self._connection.execute(
+                "SELECT status, COUNT(*) FROM outputs GROUP BY status"
+            ).fetchall()
+        )
+
+
+def get_code_version(source_paths):
+    """
+    Returns a hash of the content of the source files of a generator. Any modification of
+    these files makes the outputs of the generator stale.
+    """
+    code_hash = hashlib.sha256()
+    for source_path in source_paths:
+        code_hash.update(Path(source_path).read_bytes())
+    return code_hash.hexdigest()
+
+
+def _sha256_file(file_path, chunk_size=2**20):
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def _to_json(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,144 @@
+import numpy as np
+
+"""
+Crossfades between signals.
+A crossfade is described by a weight envelope, one weight per sample: the weight w is applied to
+the foreground signal and its complement to the background signal (1 - w, or sqrt(1 - w²) for
+the constant power transition, which keeps the power of the sum of two uncorrelated signals
+constant). The ramps of a list of transitions are written in a single pass, whatever the number
+of transitions, and the blends are computed in place in preallocated arrays.
+The transition functions f, from 0 to 1 over the ramp, are:
+- “linear”: f(x) = x
+- “cosine”: f(x) = 0.5 * (1 - cos(pi * x))
+- “constant_power”: f(x) = sin(pi / 2 * x)
+"""
+
+TRANSITION_FUNCTIONS = ("linear", "cosine", "constant_power")
+BLEND_BLOCK_SIZE = 2**16
+
+
+def get_ramp(nb_samples, transition_function="linear"):
+    """
+    Returns the nb_samples weights of a ramp from 0 to 1 (both included).
+    """
+    if transition_function == "linear":
+        return np.linspace(0, 1, nb_samples)
+    if transition_function == "cosine":
+        return 0.5 * (1 - np.cos(np.linspace(0, np.pi, nb_samples)))
+    if transition_function == "constant_power":
+        return np.sin(np.linspace(0, np.pi / 2, nb_samples))
+    raise ValueError(
+        f"Unknown transition function {transition_function}, "
+        f"expected one of {TRANSITION_FUNCTIONS}"
+    )
+
+
+def get_complement(weights, transition_function="linear", out=None):
+    """
+    Returns the weights applied to the background signal when weights are applied to the
+    foreground signal.
+    """
+    if transition_function == "constant_power":
+        out = np.square(weights, out=out)
+        np.subtract(1, out, out=out)
+        return np.sqrt(np.maximum(out, 0, out=out), out=out)
+    return np.subtract(1, weights, out=out)
+
+
+def write_ramps(envelope, starts, ends, ramp, multiply=False, fade_out_ramp=None):
+    """
+    Writes the ramp in the envelope from each sample of starts (fade in), then the reversed ramp
+    up to each sample of ends, excluded (fade out). The samples falling outside of the envelope
+    are ignored.
+    Parameters :
+    - envelope: weights, modified in place
+    - starts: first samples of the fade ins
+    - ends: samples following the fade outs
+    - ramp: weights of the fade in (see get_ramp)
+    - multiply: if True, the envelope is multiplied by the ramps instead of being replaced
+    - fade_out_ramp: weights of the fade out, the reversed ramp by default
+    """
+    if fade_out_ramp is None:
+        fade_out_ramp = ramp[::-1]
+    for first_samples, weights in (
+        (np.asarray(starts, dtype=np.int64), ramp),
+        (np.asarray(ends, dtype=np.int64) - len(fade_out_ramp), fade_out_ramp),
+    ):
+        samples = first_samples[:, np.newaxis] + np.arange(len(weights))
+        inside = (samples >= 0) & (samples < len(envelope))
+        weights = np.broadcast_to(weights, samples.shape)[inside]
+        if multiply:
+            np.multiply.at(envelope, samples[inside], weights)
+        else:
+            envelope[samples[inside]] = weights
+
+
+def blend(foreground, background, weights, transition_function="linear", out=None):
+    """
+    Returns foreground * weights + background * complement(weights) (see get_complement), the
+    weights being applied along the first axis.
+    Parameters :
+    - foreground, background: arrays of the same shape
+    - weights: weights of the foreground, one per row
+    - transition_function: transition function of the weights, for their complement
+    - out: optional array where the blend is written, can be foreground or background
+    The blend is computed by blocks of BLEND_BLOCK_SIZE rows.
+    """
+    weights = np.reshape(weights, (-1,) + (1,) * (np.ndim(foreground) - 1))
+    complement = get_complement(weights, transition_function)
+    if out is None:
+        out = np.empty(np.shape(foreground), dtype=np.result_type(foreground, weights))
+    # By blocks of rows, so that the temporary array stays small whatever the signal length
+    for start in range(0, len(out), BLEND_BLOCK_SIZE):
+        rows = slice(start, start + BLEND_BLOCK_SIZE)
+        weighted_background = background[rows] * complement[rows]
+        np.multiply(foreground[rows], weights[rows], out=out[rows])
+        out[rows] += weighted_background
+    return out
+
+
+def add_segment(data, segment_data, first_sample, weights=None):
+    """
+    Adds segment_data, multiplied by weights (one per row) if given, to data starting at row
+    first_sample. The rows falling outside of data are ignored.
+    """
+    start = max(first_sample, 0)
+    end = min(first_sample + segment_data.shape[0], data.shape[0])
+    if start >= end:
+        return
+    segment_data = segment_data[start - first_sample : end - first_sample]
+    if weights is not None:
+        segment_data = segment_data * np.reshape(
+            weights[start - first_sample : end - first_sample],
+            (-1,) + (1,) * (segment_data.ndim - 1),
+        )
+    data[start:end] += segment_data
+
+
+def write_segment(
+    data, segment_data, first_sample, fade_in=0, transition_function="linear"
+):
+    """
+    Writes segment_data in data starting at row first_sample. The rows falling outside of data
+    are ignored. During the first fade_in samples of the segment, the segment is faded in over
+    the previous content of data.
+    """
+    start = max(first_sample, 0)
+    end = min(first_sample + segment_data.shape[0], data.shape[0])
+    if start >= end:
+        return
+    fade_end = min(first_sample + fade_in, end)
+    if start < fade_end:
+        previous = data[start:fade_end].copy()
+    data[start:end] = segment_data[start - first_sample : end - first_sample]
+    if start < fade_end:
+        ramp = get_ramp(fade_in, transition_function)[
+            start - first_sample : fade_end - first_sample
+        ]
+        blend(
+            data[start:fade_end],
+            previous,
+            ramp,
+            transition_function,
+            out=data[start:fade_end],
+        )
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+"""
+Sparse representation of piecewise constant signals, such as the icing severity of the icing
+files or the turbulence column of the turbulence files, which are constant most of the time.
+A signal is stored as a list of events (start, end, level): the value is level for
+start <= t < end and the default value (0) outside of the events. The value at a time is the
+value of the dense file interpolated with interp1(..., 'previous') in the simulation.
+Events files are csv files with the columns “start”, “end” (in seconds) and “level”.
+"""
+
+
+class EventList:
+    """
+    Sorted, non-overlapping events (start, end, level) of a piecewise constant signal.
+    """
+
+    def __init__(self, starts, ends, levels, default=0):
+        """
+        Parameters :
+        - starts, ends: start and end times of the events in seconds, the end is excluded
+        - levels: value of the signal during each event, scalar or one value per event
+        - default: value of the signal outside of the events
+        """
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        self.levels = np.broadcast_to(levels, self.starts.shape).copy()
+        self.default = default
+        if self.starts.shape != self.ends.shape or self.starts.ndim != 1:
+            raise ValueError("starts and ends must be 1D arrays of the same length")
+        if np.any(self.ends < self.starts):
+            raise ValueError("The events must end after they start")
+        if np.any(self.starts[1:] < self.ends[:-1]):
+            raise ValueError("The events must be sorted and must not overlap")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"EventList({len(self)} events, default={self.default})"
+
+    @classmethod
+    def from_dense(cls, timestamps, values, default=0):
+        """
+        Returns the events of a dense signal, each value holding until the next timestamp. The
+        consecutive samples with the same value form one event, the last one ending one
+        sampling period after the last timestamp.
+        Parameters :
+        - timestamps: sorted sample times in seconds
+        - values: value of the signal at each sample
+        - default: value of the signal not stored as events
+        """
+        builder = EventListBuilder(default=default)
+        builder.add_samples(timestamps, values)
+        return builder.to_event_list()
+
+    def value_at(self, t):
+        """
+        Returns the value of the signal at time t, in O(log(number of events)).
+        """
+        i = np.searchsorted(self.starts, t, side="right") - 1
+        if i >= 0 and t < self.ends[i]:
+            return self.levels[i]
+        return self.default
+
+    def values_at(self, times):
+        """
+        Returns the values of the signal at each of the times.
+        """
+        times = np.asarray(times, dtype=float)
+        indexes = np.searchsorted(self.starts, times, side="right") - 1
+        in_event = indexes >= 0
+        in_event[in_event] = times[in_event] < self.ends[indexes[in_event]]
+        values = np.full(
+            times.shape,
+            self.default,
+            dtype=np.result_type(self.levels, self.default),
+        )
+        values[in_event] = self.levels[indexes[in_event]]
+        return values
+
+    def to_df(self):
+        """
+        Returns the events as a dataframe with the columns of the events files.
+        """
+        return pd.DataFrame(
+            {"start": self.starts, "end": self.ends, "level": self.levels}
+        )
+
+    def to_dense_df(self, timestamps, column_name):
+        """
+        Returns the dense dataframe (timestamp, column_name) of the signal at the timestamps,
+        with the layout of the icing files.
+        """
+        return pd.DataFrame(
+            {"timestamp": timestamps, column_name: self.values_at(timestamps)}
+        )
+
+    def write_csv(self, file_path):
+        """
+        Writes the events file.
+        """
+        self.to_df().to_csv(file_path, index=False)
+
+    @classmethod
+    def read_csv(cls, file_path, default=0):
+        """
+        Reads an events file written by write_csv.
+        """
+        df = pd.read_csv(file_path)
+        return cls(
+            df["start"].to_numpy(),
+            df["end"].to_numpy(),
+            df["level"].to_numpy(),
+            default=default,
+        )
+
+    def write_dense_csv(self, file_path, timestamps, column_name):
+        """
+        Writes the signal sampled at the timestamps in a dense csv file (timestamp, column_name),
+        the layout of the icing files read by file_generation.m.
+        """
+        self.to_dense_df(timestamps, column_name).to_csv(file_path, index=False)
+
+
+class EventListBuilder:
+    """
+    Builds the EventList of a dense signal given in consecutive blocks of samples, with the
+    events of EventList.from_dense on the whole signal. Only the run of samples still open at
+    the end of the last block is kept, so the dense signal is never stored.
+    """
+
+    def __init__(self, default=0):
+        """
+        Parameters :
+        - default: value of the signal not stored as events
+        """
+        self.default = default
+        self._starts = list()
+        self._ends = list()
+        self._levels = list()
+        self._run_start = None  # Start time and value of the open run
+        self._run_value = None
+        self._last_timestamps = np.empty(0)  # Last two timestamps, for the last period
+
+    def add_samples(self, timestamps, values):
+        """
+        Adds the next block of samples of the signal.
+        Parameters :
+        - timestamps: sorted sample times in seconds, after the ones of the previous blocks
+        - values: value of the signal at each sample
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values)
+        if len(timestamps) == 0:
+            return
+        if self._run_value is None:
+            run_starts = np.flatnonzero(np.diff(values, prepend=np.nan) != 0)
+            starts = timestamps[run_starts]
+            levels = values[run_starts]
+        else:
+            run_starts = np.flatnonzero(np.diff(values, prepend=self._run_value) != 0)
+            starts = np.append(self._run_start, timestamps[run_starts])
+            levels = np.append(self._run_value, values[run_starts])
+        # Each run but the last one ends at the start of the next run
+        is_event = levels[:-1] != self.default
+        self._starts.append(starts[:-1][is_event])
+        self._ends.append(starts[1:][is_event])
+        self._levels.append(levels[:-1][is_event])
+        self._run_start = starts[-1]
+        self._run_value = levels[-1]
+        self._last_timestamps = np.append(self._last_timestamps, timestamps[-2:])[-2:]
+
+    def to_event_list(self):
+        """
+        Returns the events of the samples added so far, the open run ending one sampling period
+        after the last timestamp.
+        """
+        if self._run_value is None:
+            return EventList([], [], np.array([]), default=self.default)
+        last_period = (
+            np.diff(self._last_timestamps)[0] if len(self._last_timestamps) > 1 else 1
+        )
+        starts, ends, levels = list(self._starts), list(self._ends), list(self._levels)
+        if self._run_value != self.default:
+            starts.append([self._run_start])
+            ends.append([self._last_timestamps[-1] + last_period])
+            levels.append([self._run_value])
+        return EventList(
+            np.concatenate(starts),
+            np.concatenate(ends),
+            np.concatenate(levels),
+            default=self.default,
+        )
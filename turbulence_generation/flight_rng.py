@@ -0,0 +1,31 @@
+import hashlib
+
+import numpy as np
+
+"""
+Random generators of the flights, shared by the turbulence and the icing generation.
+The generator of a flight is derived from a master seed and the flight name, so each flight gets
+an independent stream which does not depend on the other flights nor on the number of workers.
+The spawn keys are (flight key,) for the turbulence stream, (flight key, SEGMENT_STREAM, segment)
+for its segments (turbulence_generator.get_segment_rng) and (flight key, stream) for the other
+streams of the flight, such as the icing one (icing_generator.ICING_STREAM).
+"""
+
+
+def get_flight_rng(seed, flight_name, stream=None):
+    """
+    Returns the random generator of a flight, derived from a master seed and the flight name.
+    Each flight gets an independent stream, which only depends on the master seed and on the
+    flight name, so a single flight can be regenerated on its own.
+    If seed is None, the stream is seeded from fresh entropy.
+    Parameters :
+    - seed: master seed
+    - flight_name: name of the flight
+    - stream: id of the stream, to draw independent generators for the same flight (None for
+    the turbulence stream)
+    """
+    flight_key = int.from_bytes(
+        hashlib.sha256(flight_name.encode()).digest()[:8], "little"
+    )
+    spawn_key = (flight_key,) if stream is None else (flight_key, stream)
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=spawn_key))
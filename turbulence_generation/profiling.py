@@ -0,0 +1,159 @@
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+
+"""
+Opt-in instrumentation of the file generation.
+A StageProfiler is given to the file generation functions (create_turbulence_files,
+create_calm_conditions_files, ...), which activate it while a flight is generated. The generation
+code marks its stages with profiling.stage(name) and profiling.add_bytes(name, nbytes), which do
+nothing when no profiler is active.
+"""
+
+_active_profiler = None
+_NO_STAGE = nullcontext()
+
+
+class StageProfiler:
+    """
+    Registry of the time spent, the number of calls and the bytes written per stage, for each
+    flight. Stages can be nested, the time of a stage includes the time of its nested stages.
+    """
+
+    def __init__(self):
+        self.flights = dict()
+        self._current_flight = None
+
+    @contextmanager
+    def flight(self, flight_name):
+        """
+        Context manager recording the stages of the block in the flight_name flight.
+        """
+        previous_flight = self._current_flight
+        self._current_flight = self.flights.setdefault(flight_name, dict())
+        try:
+            yield
+        finally:
+            self._current_flight = previous_flight
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager timing the block as the stage name of the current flight.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self._get_stage(name)
+            stage["calls"] += 1
+            stage["time_s"] += time.perf_counter() - start
+
+    def add_bytes(self, name, nbytes):
+        """
+        Adds nbytes to the bytes written by the stage name of the current flight.
+        """
+        self._get_stage(name)["bytes"] += nbytes
+
+    def merge(self, flights):
+        """
+        Adds the flights of another profiler (StageProfiler.flights), for example the profiler
+        of a worker process.
+        """
+        for flight_name, stages in flights.items():
+            flight = self.flights.setdefault(flight_name, dict())
+            for name, stage in stages.items():
+                merged_stage = flight.setdefault(name, _new_stage())
+                for key in merged_stage:
+                    merged_stage[key] += stage[key]
+
+    def totals(self):
+        """
+        Returns the stages aggregated over all the flights.
+        """
+        totals = dict()
+        for stages in self.flights.values():
+            for name, stage in stages.items():
+                total = totals.setdefault(name, _new_stage())
+                for key in total:
+                    total[key] += stage[key]
+        return totals
+
+    def report(self):
+        """
+        Returns the per-flight and aggregated stages, as a dictionary.
+        """
+        return {"flights": self.flights, "total": self.totals()}
+
+    def save_json(self, file_path):
+        """
+        Saves the report in a JSON file.
+        """
+        with open(file_path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def log_report(self, logger=None, level=logging.INFO):
+        """
+        Logs one line per flight and stage, and the aggregated stages.
+        """
+        logger = logger or logging.getLogger(__name__)
+        for flight_name, stages in list(self.flights.items()) + [
+            ("total", self.totals())
+        ]:
+            for name, stage in stages.items():
+                logger.log(
+                    level,
+                    "%s %s: %d calls, %.3f s, %d bytes",
+                    flight_name,
+                    name,
+                    stage["calls"],
+                    stage["time_s"],
+                    stage["bytes"],
+                )
+
+    def _get_stage(self, name):
+        if self._current_flight is None:
+            raise RuntimeError("Stages must be recorded inside StageProfiler.flight")
+        return self._current_flight.setdefault(name, _new_stage())
+
+
+def _new_stage():
+    return {"calls": 0, "time_s": 0.0, "bytes": 0}
+
+
+@contextmanager
+def activate(profiler, flight_name):
+    """
+    Context manager making profiler the active profiler while the flight_name flight is
+    generated. Does nothing if profiler is None.
+    """
+    global _active_profiler
+    if profiler is None:
+        yield
+        return
+    previous_profiler = _active_profiler
+    _active_profiler = profiler
+    try:
+        with profiler.flight(flight_name):
+            yield
+    finally:
+        _active_profiler = previous_profiler
+
+
+def stage(name):
+    """
+    Returns a context manager timing the block as the stage name of the active profiler, or a
+    context manager doing nothing if no profiler is active.
+    """
+    if _active_profiler is None:
+        return _NO_STAGE
+    return _active_profiler.stage(name)
+
+
+def add_bytes(name, nbytes):
+    """
+    Adds nbytes to the bytes written by the stage name of the active profiler, if any.
+    """
+    if _active_profiler is not None:
+        _active_profiler.add_bytes(name, nbytes)
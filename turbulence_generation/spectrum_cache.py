@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+
+class SpectrumCache:
+    """
+    Bounded LRU cache of turbulence spectrum amplitudes.
+    The spectrum amplitudes only depend on the number of samples, the sampling frequency, the
+    aircraft speed, the altitude, the turbulence level and the aircraft wingspan. Segment lengths
+    and flight conditions repeat a lot across a fleet of flights, so caching the amplitudes leaves
+    only the random phase draw and the inverse Fourier transform to be computed for each segment.
+    The speed and the altitude are quantized before being used as keys, the quantized values are
+    the ones used to compute the spectra, so that the generated turbulence does not depend on the
+    cache state.
+    The same cache can be shared across files and flights.
+    Parameters :
+    - maxsize: maximal number of spectra kept in the cache
+    - v_resolution: quantization step of the aircraft speed, m.s-1. None to disable quantization.
+    - h_resolution: quantization step of the altitude, m. None to disable quantization.
+    """
+
+    def __init__(self, maxsize=128, v_resolution=1.0, h_resolution=10.0):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.v_resolution = v_resolution
+        self.h_resolution = h_resolution
+        self.hits = 0
+        self.misses = 0
+        self._spectra = OrderedDict()
+
+    def quantize(self, v, h):
+        """
+        Returns the speed and the altitude rounded to the cache resolutions.
+        """
+        if self.v_resolution:
+            v = round(v / self.v_resolution) * self.v_resolution
+        if self.h_resolution:
+            h = round(h / self.h_resolution) * self.h_resolution
+        return v, h
+
+    def get(self, key, compute_function):
+        """
+        Returns the spectrum amplitudes stored for key. On a miss, the amplitudes are computed by
+        compute_function (called without arguments) and stored, evicting the least recently used
+        entry if the cache is full.
+        The returned arrays are read-only since they are shared between segments.
+        """
+        try:
+            magnitudes = self._spectra[key]
+        except KeyError:
+            self.misses += 1
+            magnitudes = compute_function()
+            magnitudes.flags.writeable = False
+            self._spectra[key] = magnitudes
+            if len(self._spectra) > self.maxsize:
+                self._spectra.popitem(last=False)
+            return magnitudes
+        self.hits += 1
+        self._spectra.move_to_end(key)
+        return magnitudes
+
+    def clear(self):
+        """
+        Empties the cache and resets the hit and miss counters.
+        """
+        self._spectra.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._spectra)
+
+    def info(self):
+        """
+        Returns a dictionary with the cache statistics.
+        """
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "size": len(self._spectra),
+            "maxsize": self.maxsize,
+            "nbytes": sum(spectrum.nbytes for spectrum in self._spectra.values()),
+        }
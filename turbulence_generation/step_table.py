@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+from turbulence_io import FILE_EXTENSIONS, read_table, write_table
+
+"""
+Step tables of the turbulence and calm conditions files, for the fixed time step of the
+simulation (delta_t in file_generation.m).
+Row k of a step table corresponds to the simulation step starting at t_k = k * delta_t. It holds
+t_k, the turbulence columns interpolated at t_k (as getTurbulence does) and the rows
+first_row:last_row of the turbulence file (1-based, Matlab indexing) with a timestamp between
+t_k - STEP_WINDOW_MARGIN and t_k + delta_t + STEP_WINDOW_MARGIN, that is the turbDataSmall
+subset needed by the integration of the step. The simulation then indexes the table by step
+number instead of filtering the whole turbulence file at each step.
+A step table is written next to its turbulence file, as <turbulence file name>_steps, in the same
+file format. Its values are always float64, so that the row numbers stay exact.
+The step table of a turbulence file written in blocks is computed block after block with
+StepTableBuilder, without reading the file back.
+"""
+
+SIMULATION_TIME_STEP = 0.05  # delta_t of file_generation.m, in seconds
+# Margin of the turbDataSmall subset of file_generation.m, in seconds
+STEP_WINDOW_MARGIN = 1
+STEP_TABLE_SUFFIX = "_steps"
+
+
+def get_nb_simulation_steps(flight_end_time, delta_t=SIMULATION_TIME_STEP):
+    """
+    Returns the number of steps of the simulation of a flight ending at flight_end_time (last
+    timestamp of the instruction file), as computed in file_generation.m.
+    """
+    return int(np.floor(flight_end_time / delta_t + 1e-9))
+
+
+def interpolate_rows(x, y, xi):
+    """
+    Linear interpolation of all the columns of y at once, as interp1qr.m does: returns the
+    (len(xi), nb_columns) array of the values at xi, NaN outside of [x[0], x[-1]].
+    Parameters :
+    - x: increasing sample times
+    - y: (len(x), nb_columns) array of values
+    - xi: times where the values are interpolated
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    xi = np.asarray(xi, dtype=float)
+    left = np.clip(np.searchsorted(x, xi, side="right") - 1, 0, len(x) - 2)
+    t = (xi - x[left]) / (x[left + 1] - x[left])
+    yi = y[left] + t[:, np.newaxis] * (y[left + 1] - y[left])
+    yi[(xi < x[0]) | (xi > x[-1])] = np.nan
+    return yi
+
+
+def create_step_table(
+    turbulence_data, nb_steps, delta_t=SIMULATION_TIME_STEP, margin=STEP_WINDOW_MARGIN
+):
+    """
+    Returns the step table of a turbulence table (see the module description).
+    Parameters :
+    - turbulence_data: dataframe with the layout of the turbulence files (timestamp, turbulence,
+    u, v, w, p, q, r)
+    - nb_steps: number of simulation steps (see get_nb_simulation_steps)
+    - delta_t: time step of the simulation in seconds
+    - margin: margin of the turbulence file rows selected around each step, in seconds
+    """
+    builder = StepTableBuilder(nb_steps, delta_t, margin)
+    builder.add_rows(turbulence_data)
+    return builder.to_df()
+
+
+class StepTableBuilder:
+    """
+    Computes the step table of a turbulence table given in consecutive blocks of rows, with the
+    values of create_step_table on the whole table. Only the last two rows of the blocks are
+    kept, so the turbulence table is never stored: the step table is filled as the steps
+    covered by the added rows are known.
+    """
+
+    def __init__(
+        self, nb_steps, delta_t=SIMULATION_TIME_STEP, margin=STEP_WINDOW_MARGIN
+    ):
+        """
+        Parameters :
+        - nb_steps: number of simulation steps (see get_nb_simulation_steps)
+        - delta_t: time step of the simulation in seconds
+        - margin: margin of the turbulence file rows selected around each step, in seconds
+        """
+        self.step_times = np.arange(nb_steps) * delta_t
+        self._first_times = self.step_times - margin
+        self._last_times = self.step_times + delta_t + margin
+        self._columns = None
+        self._values = None  # Interpolated columns of each step
+        self._first_rows = np.empty(nb_steps, dtype=np.int64)
+        self._last_rows = np.empty(nb_steps, dtype=np.int64)
+        # Number of rows added and first steps whose values and rows are not known yet
+        self._nb_rows = 0
+        self._next_value_step = 0
+        self._next_first_row_step = 0
+        self._next_last_row_step = 0
+        self._last_timestamps = np.empty(0)  # Last two rows, for the interpolation
+        self._last_row_values = None
+
+    def add_rows(self, turbulence_data):
+        """
+        Adds the next rows of the turbulence table.
+        Parameters :
+        - turbulence_data: dataframe with the layout of the turbulence files, whose timestamps
+        follow the ones of the previous rows
+        """
+        if len(turbulence_data) == 0:
+            return
+        timestamps = turbulence_data["timestamp"].to_numpy(dtype=float)
+        if self._columns is None:
+            self._columns = [
+                column for column in turbulence_data.columns if column != "timestamp"
+            ]
+            self._values = np.empty((len(self.step_times), len(self._columns)))
+            self._last_row_values = np.empty((0, len(self._columns)))
+        values = turbulence_data[self._columns].to_numpy(dtype=float)
+        if self._nb_rows > 0:
+            timestamps = np.concatenate((self._last_timestamps, timestamps))
+            values = np.concatenate((self._last_row_values, values))
+        if len(timestamps) > 1:
+            # The steps before the last timestamp are interpolated between rows already added
+            end = np.searchsorted(self.step_times, timestamps[-1])
+            self._values[self._next_value_step : end] = interpolate_rows(
+                timestamps, values, self.step_times[self._next_value_step : end]
+            )
+            self._next_value_step = max(self._next_value_step, end)
+        # The next rows are after the last timestamp, so they are not counted for the steps
+        # whose row bounds are before it
+        first_row_offset = self._nb_rows - (len(timestamps) - len(turbulence_data))
+        end = np.searchsorted(self._first_times, timestamps[-1], side="right")
+        steps = slice(self._next_first_row_step, end)
+        self._first_rows[steps] = (
+            first_row_offset + np.searchsorted(timestamps, self._first_times[steps]) + 1
+        )
+        self._next_first_row_step = max(self._next_first_row_step, end)
+        end = np.searchsorted(self._last_times, timestamps[-1], side="right")
+        steps = slice(self._next_last_row_step, end)
+        self._last_rows[steps] = first_row_offset + np.searchsorted(
+            timestamps, self._last_times[steps], side="right"
+        )
+        self._next_last_row_step = max(self._next_last_row_step, end)
+        self._nb_rows += len(turbulence_data)
+        self._last_timestamps = timestamps[-2:]
+        self._last_row_values = values[-2:]
+
+    def to_df(self):
+        """
+        Returns the step table of the rows added so far.
+        """
+        # The last steps are interpolated between the last two rows (NaN after the last one)
+        self._values[self._next_value_step :] = interpolate_rows(
+            self._last_timestamps,
+            self._last_row_values,
+            self.step_times[self._next_value_step :],
+        )
+        self._first_rows[self._next_first_row_step :] = self._nb_rows + 1
+        self._last_rows[self._next_last_row_step :] = self._nb_rows
+        step_table = pd.DataFrame(self._values, columns=self._columns)
+        step_table.insert(0, "timestamp", self.step_times)
+        step_table["first_row"] = self._first_rows
+        step_table["last_row"] = self._last_rows
+        return step_table
+
+    def write(self, turbulence_file_path, file_format="csv"):
+        """
+        Writes the step table of the rows added so far next to their turbulence file and returns
+        its path.
+        Parameters :
+        - turbulence_file_path: path of the turbulence file
+        - file_format: “csv”, “npy” or “bin”
+        """
+        step_table_path = get_step_table_path(turbulence_file_path)
+        write_table(
+            self.to_df(), step_table_path, file_format=file_format, dtype=np.float64
+        )
+        return step_table_path
+
+
+def get_step_table_path(turbulence_file_path):
+    """
+    Returns the path of the step table of a turbulence file.
+    """
+    return turbulence_file_path.with_name(
+        turbulence_file_path.stem + STEP_TABLE_SUFFIX + turbulence_file_path.suffix
+    )
+
+
+def write_step_table(
+    turbulence_data,
+    turbulence_file_path,
+    flight_end_time,
+    delta_t=SIMULATION_TIME_STEP,
+    file_format="csv",
+):
+    """
+    Writes the step table of a turbulence table next to its turbulence file.
+    Parameters :
+    - turbulence_data: dataframe with the layout of the turbulence files
+    - turbulence_file_path: path of the turbulence file
+    - flight_end_time: last timestamp of the instruction file of the flight
+    - delta_t: time step of the simulation in seconds
+    - file_format: “csv”, “npy” or “bin”
+    Returns the path of the step table.
+    """
+    builder = StepTableBuilder(
+        get_nb_simulation_steps(flight_end_time, delta_t), delta_t
+    )
+    builder.add_rows(turbulence_data)
+    return builder.write(turbulence_file_path, file_format=file_format)
+
+
+def create_step_table_files(
+    instruction_dir_path, turbulence_dir_path, delta_t=SIMULATION_TIME_STEP
+):
+    """
+    Writes the missing step tables of the turbulence and calm conditions files of a directory,
+    in the format of each file.
+    Parameters :
+    - instruction_dir_path: path to the folder containing the flight instruction files
+    - turbulence_dir_path: path to the folder containing the turbulence files
+    - delta_t: time step of the simulation in seconds
+    """
+    for instruction_file_path in sorted(instruction_dir_path.glob("*.csv")):
+        flight_end_time = None
+        for wind_type in ("_turbwind", "_calmwind"):
+            for file_format, extension in FILE_EXTENSIONS.items():
+                turbulence_file_path = turbulence_dir_path / (
+                    instruction_file_path.stem + wind_type + extension
+                )
+                if (
+                    not turbulence_file_path.exists()
+                    or get_step_table_path(turbulence_file_path).exists()
+                ):
+                    continue
+                if flight_end_time is None:
+                    flight_end_time = pd.read_csv(instruction_file_path)[
+                        "timestamp"
+                    ].iloc[-1]
+                write_step_table(
+                    read_table(turbulence_file_path),
+                    turbulence_file_path,
+                    flight_end_time,
+                    delta_t,
+                    file_format=file_format,
+                )
@@ -0,0 +1,225 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from turbulence_generator import (
+    get_flight_duration,
+    get_turbulence_parameters,
+    time_index,
+)
+from turbulence_spectra import filter_polynomials
+
+"""
+Time-domain turbulence generation with the rational filters of MIL-HDBK-1797A (Hu, Hv, Hw, Hp, Hq
+and Hr of turbulence_spectra), for long or open-ended simulations.
+The filters are discretized with the bilinear (Tustin) transform into IIR filters driven by white
+noise, so that the samples are generated block after block in constant memory, at a constant
+cost per sample, whatever the duration. As in MIL-HDBK-1797A, q is obtained by filtering w and r
+by filtering v, and u, v, w and p are driven by independent noises.
+The filters are recomputed when the speed or the altitude change (FilteredTurbulenceGenerator.
+update), and their states are kept, so that the turbulence stays continuous.
+Unlike the spectral generation of turbulence_generator, the filters are not band-limited to the
+bandwidth of the turbulence parameters and the spectra are the rational approximations of the
+von Kármán spectra.
+The samples have the standard deviations σ of the turbulence parameters, as in MIL-HDBK-1797A.
+The spectral generation of turbulence_generator does not scale its spectra by the frequency
+resolution, so its standard deviations are σ·sqrt(V / (π·fs)), V being the aircraft speed and fs
+the sampling frequency: at 100 m/s and 100 Hz, the filtered turbulence is about 1.8 times
+larger. The samples multiplied by sqrt(V / (π·fs)) have the scale of the turbulence files.
+Requires scipy.
+"""
+
+# Channels driven by white noise, the q and r filters are driven by w and v
+NOISE_CHANNELS = ("u", "v", "w", "p")
+# Duration of the start-up of the filters, in largest time constants (L / V), discarded so that
+# the first samples are already stationary
+WARM_UP_TIME_CONSTANTS = 5
+
+
+def bilinear_transform(numerator, denominator, sampling_frequency):
+    """
+    Returns the discrete filter (b, a), normalized so that a[0] is 1, of the continuous filter
+    numerator(s) / denominator(s) (coefficients by decreasing powers of s), with the bilinear
+    transform s = 2 * sampling_frequency * (z - 1) / (z + 1). Same result as
+    scipy.signal.bilinear, faster for the low orders of the turbulence filters.
+    """
+    order = max(len(numerator), len(denominator)) - 1
+    basis = _bilinear_basis(order, sampling_frequency)
+    b = np.asarray(numerator, dtype=float) @ basis[order + 1 - len(numerator) :]
+    a = np.asarray(denominator, dtype=float) @ basis[order + 1 - len(denominator) :]
+    return b / a[0], a / a[0]
+
+
+@lru_cache
+def _bilinear_basis(order, sampling_frequency):
+    """
+    Returns the polynomials in z of (2 * sampling_frequency * (z - 1) / (z + 1)) ** k multiplied
+    by (z + 1) ** order, for k from order to 0.
+    """
+    return np.array(
+        [
+            (2 * sampling_frequency) ** k
+            * np.polymul(np.poly(np.ones(k)), np.poly(-np.ones(order - k)))
+            for k in range(order, -1, -1)
+        ]
+    )
+
+
+def get_discrete_filters(turbulence_parameters, sampling_frequency):
+    """
+    Returns the discrete filters (b, a) of the u, v, w, p, q_w and r_v channels (see
+    turbulence_spectra.filter_polynomials), discretized with the bilinear transform.
+    Parameters :
+    - turbulence_parameters: dictionary of turbulence parameters (see get_turbulence_parameters)
+    - sampling_frequency: turbulence sampling frequency
+    """
+    return {
+        channel: bilinear_transform(numerator, denominator, sampling_frequency)
+        for channel, (numerator, denominator) in filter_polynomials(
+            turbulence_parameters
+        ).items()
+    }
+
+
+class FilteredTurbulenceGenerator:
+    """
+    Streaming turbulence generator (see the module description). update must be called before the
+    first call to generate, and each time the flight conditions change.
+    Parameters :
+    - plane_parameters: dictionary of aircraft parameters (“b”: aircraft wingspan)
+    - sampling_frequency: turbulence sampling frequency
+    - turbulence_level: turbulence level (0, 1, 2 or 3, see get_turbulence_parameters)
+    - rng: numpy random generator (np.random.Generator) or seed
+    """
+
+    def __init__(
+        self, plane_parameters, sampling_frequency=100, turbulence_level=2, rng=None
+    ):
+        self.plane_parameters = plane_parameters
+        self.sampling_frequency = sampling_frequency
+        self.turbulence_level = turbulence_level
+        self.rng = np.random.default_rng(rng)
+        self.turbulence_parameters = None
+        self._filters = None
+        self._states = None
+
+    def update(self, v, h):
+        """
+        Recomputes the filters for the aircraft speed v (m.s-1) and the altitude h (m). The states
+        of the filters are kept. At the first update, the filters are run for
+        WARM_UP_TIME_CONSTANTS time constants and the samples are discarded.
+        """
+        self.turbulence_parameters = get_turbulence_parameters(
+            v,
+            h,
+            self.plane_parameters,
+            self.sampling_frequency,
+            self.turbulence_level,
+        )
+        self._filters = get_discrete_filters(
+            self.turbulence_parameters, self.sampling_frequency
+        )
+        if self._states is None:
+            self._states = {
+                channel: np.zeros(len(a) - 1)
+                for channel, (b, a) in self._filters.items()
+            }
+            time_constant = (
+                max(
+                    self.turbulence_parameters["Lu"],
+                    2 * self.turbulence_parameters["Lv"],
+                    2 * self.turbulence_parameters["Lw"],
+                )
+                / v
+            )
+            self.generate(
+                int(WARM_UP_TIME_CONSTANTS * time_constant * self.sampling_frequency)
+            )
+
+    def generate(self, nb_samples):
+        """
+        Returns the next nb_samples samples of turbulence, as an array of shape (nb_samples, 6)
+        with the u, v, w, p, q and r columns.
+        """
+        # White noise of unit two-sided power spectral density, per rad.s-1, of the filters
+        noise = self.rng.standard_normal((len(NOISE_CHANNELS), nb_samples)) * np.sqrt(
+            np.pi * self.sampling_frequency
+        )
+        turbulence = np.empty((nb_samples, 6))
+        outputs = dict()
+        for channel, channel_noise in zip(NOISE_CHANNELS, noise):
+            outputs[channel] = self._filter(channel, channel_noise)
+        outputs["q"] = self._filter("q_w", outputs["w"])
+        outputs["r"] = self._filter("r_v", outputs["v"])
+        for i, channel in enumerate(("u", "v", "w", "p", "q", "r")):
+            turbulence[:, i] = outputs[channel]
+        return turbulence
+
+    def _filter(self, channel, x):
+        b, a = self._filters[channel]
+        y, self._states[channel] = lfilter(b, a, x, zi=self._states[channel])
+        return y
+
+
+def iter_filtered_turbulence(
+    safire_data,
+    plane_parameters,
+    sampling_frequency=100,
+    turbulence_level=2,
+    parameter_actualisation_period=1,
+    block_duration=60,
+    rng=None,
+):
+    """
+    Generates the turbulence of a flight with a FilteredTurbulenceGenerator, yielding consecutive
+    dataframes of block_duration seconds (the last block can be shorter), with the columns and
+    the index of create_turbulence_complete_flight. The turbulence column is 1 if
+    turbulence_level is not 0.
+    Parameters :
+    - safire_data: dataframe containing flight instructions
+    - plane_parameters: dictionary of aircraft parameters (“b”: aircraft wingspan)
+    - sampling_frequency: turbulence sampling frequency
+    - turbulence_level: turbulence level during the flight (0, 1, 2 or 3)
+    - parameter_actualisation_period: period of the update of the filters from the speed and the
+    altitude of the flight plan, in seconds
+    - block_duration: duration of the yielded blocks, in seconds
+    - rng: numpy random generator (np.random.Generator) or seed
+    """
+    generator = FilteredTurbulenceGenerator(
+        plane_parameters, sampling_frequency, turbulence_level, rng
+    )
+    timestamps = safire_data["timestamp"].to_numpy(dtype=float)
+    v_series = safire_data["platform_speed_wrt_air : from pitot (m/s)"].to_numpy()
+    h_series = safire_data["altitude : from GPS (meter)"].to_numpy()
+    nb_samples = get_flight_duration(safire_data) * sampling_frequency
+    period = max(int(parameter_actualisation_period * sampling_frequency), 1)
+    block_size = int(block_duration * sampling_frequency)
+    for block_start in range(0, nb_samples, block_size):
+        block_end = min(block_start + block_size, nb_samples)
+        block = np.empty((block_end - block_start, 7))
+        block[:, 6] = 1.0 if turbulence_level else 0.0
+        sample = block_start
+        while sample < block_end:
+            if sample % period == 0:
+                time = sample / sampling_frequency
+                generator.update(
+                    np.interp(time, timestamps, v_series),
+                    np.interp(time, timestamps, h_series),
+                )
+            next_sample = min((sample // period + 1) * period, block_end)
+            block[sample - block_start : next_sample - block_start, :6] = (
+                generator.generate(next_sample - sample)
+            )
+            sample = next_sample
+        yield pd.DataFrame(
+            index=time_index(
+                block_start / sampling_frequency,
+                block_end - block_start,
+                sampling_frequency,
+            ),
+            columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+            data=block,
+            copy=False,
+        )
@@ -1,4 +1,5 @@
-import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
@@ -16,11 +17,45 @@ from turbulence_spectra import (
     f_p,
     f_q,
     f_r,
+    spectra_magnitudes,
 )
 from turbulence_parameters import (
     turbulence_std,
     turbulence_scale_length,
     turbulence_bandwidth,
+    turbulence_std_array,
+    turbulence_scale_length_array,
+    turbulence_bandwidth_array,
+)
+from turbulence_io import FILE_EXTENSIONS, write_table, write_table_blocks
+from event_list import EventListBuilder
+from step_table import StepTableBuilder, get_nb_simulation_steps
+from build_manifest import get_code_version
+from flight_rng import get_flight_rng
+from crossfade import add_segment, blend, get_ramp, write_ramps, write_segment
+import profiling
+
+SPECTRA_FUNCTIONS = (f_u, f_v, f_w, f_p, f_q, f_r)
+SEGMENT_STREAM = 0  # Spawn key of the segment streams (see get_segment_rng)
+# Number of blocks synthesized by a single inverse Fourier transform
+OVERLAP_ADD_BATCH_SIZE = 32
+# Maximal number of segments of the same size synthesized by a single inverse Fourier transform
+# (see synthesize_batch), which bounds the memory of their spectra
+SYNTHESIS_BATCH_SIZE = 32
+# Source files whose modification makes the generated files stale (see build_manifest)
+GENERATION_SOURCES = tuple(
+    Path(__file__).with_name(file_name)
+    for file_name in (
+        "turbulence_generator.py",
+        "turbulence_parameters.py",
+        "turbulence_spectra.py",
+        "turbulence_io.py",
+        "event_list.py",
+        "step_table.py",
+        "crossfade.py",
+        "spectrum_cache.py",
+        "flight_rng.py",
+    )
 )
 
 
@@ -32,15 +67,31 @@ def create_turbulence_files(
     turbulence_part=0.05,
     sampling_frequency=100,
     turbulence_level=2,
+    spectrum_cache=None,
+    workers=1,
+    seed=None,
+    block_duration=None,
+    max_segment_duration=600,
+    file_format="csv",
+    dtype=np.float64,
+    file_dtype=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    profiler=None,
+    write_events=False,
+    step_delta_t=None,
+    manifest=None,
 ):
     """
     Creates turbulence files.
     Files are created in the turbulence_dir_path folder.
-    Files are csv files with 8 columns: time, turbulence, u, v, w, p, q, r.
+    Files are csv files (or binary files, see file_format) with 8 columns: time, turbulence, u, v,
+    w, p, q, r.
     The turbulence column is binary and indicates whether turbulence is in progress. The
     u, v and w columns are the turbulence translational components. The p, q and r columns are the
     turbulence rotational components.
-    Turbulence is generated using the generate_3d_turbulence function.
+    The turbulence segments are synthesized by batches (see generate_turbulence_batch), or
+    continuously by the “overlap_add” synthesis (see generate_nonstationary_turbulence).
     The instants in the files are the instants during turbulence,
     sampled at sampling_frequency, as well as a sample before and after
     and after turbulence, with u=v=w=0 and p=q=r=0, to obtain the turbulence wind at any time
@@ -54,26 +105,224 @@ def create_turbulence_files(
     - sampling_frequency: turbulence sampling frequency
     - turbulence_level: turbulence level during turbulence. Possible turbulence levels
     are 1 (light), 2 (moderate) and 3 (severe).
+    - spectrum_cache: optional spectrum_cache.SpectrumCache shared by all the flights. With
+    several workers, each worker process uses its own copy of the cache.
+    - workers: number of processes generating the flights in parallel
+    - seed: master seed. The random generator of each flight is derived from the master seed and
+    the flight name (see get_flight_rng), so the files do not depend on the number of workers.
+    - block_duration: if given, the turbulence of each flight is generated and written by blocks
+    of block_duration seconds (see iter_turbulence_complete_flight) to bound the memory used.
+    - max_segment_duration: maximal duration of a generated segment in seconds (see
+    get_turbulence_segments), which bounds the memory used with block_duration. None to generate
+    each segment in one piece.
+    - file_format: format of the files, “csv”, “npy” or “bin” (see turbulence_io)
+    - dtype: float type of the generated turbulence (np.float32 or np.float64, see
+    create_turbulence_complete_flight)
+    - file_dtype: float type of the values in binary files (np.float32 or np.float64), dtype by
+    default
+    - synthesis: “segments” or “overlap_add” (see create_turbulence_complete_flight)
+    - synthesis_block_duration: duration of the blocks of the “overlap_add” synthesis, in seconds
+    - profiler: optional profiling.StageProfiler recording the time spent in each generation stage
+    and the bytes written, per flight
+    - write_events: if True, the turbulence column of each flight is also written as an events
+    file <flight>_turbulence_events.csv (see event_list.EventList)
+    - step_delta_t: if given, a step table for a simulation time step of step_delta_t seconds is
+    written next to each file (see step_table)
+    - manifest: optional build_manifest.BuildManifest. Without manifest, the existing files are
+    skipped. With a manifest, the files which are not up to date (flight plan content,
+    parameters, seed or generation code changed, or generation not completed) are regenerated.
+    Without seed, the files cannot be reproduced, so they are always regenerated and never
+    recorded as up to date.
+    """
+    tasks = list()
+    for file_path in instruction_dir_path.glob("*.csv"):
+        turb_file_path = turbulence_dir_path / (
+            file_path.name[:-4] + "_turbwind" + FILE_EXTENSIONS[file_format]
+        )
+        tasks.append(
+            {
+                "instruction_file_path": file_path,
+                "turb_file_path": turb_file_path,
+                "plane_parameters": plane_parameters,
+                "turbulence_mean_length": turbulence_mean_length,
+                "turbulence_part": turbulence_part,
+                "sampling_frequency": sampling_frequency,
+                "turbulence_level": turbulence_level,
+                "seed": seed,
+                "block_duration": block_duration,
+                "max_segment_duration": max_segment_duration,
+                "file_format": file_format,
+                "dtype": dtype,
+                "file_dtype": file_dtype,
+                "synthesis": synthesis,
+                "synthesis_block_duration": synthesis_block_duration,
+                "write_events": write_events,
+                "step_delta_t": step_delta_t,
+            }
+        )
+    run_flight_tasks(
+        create_turbulence_file,
+        _select_tasks(tasks, "turb_file_path", manifest, spectrum_cache),
+        workers,
+        spectrum_cache,
+        profiler,
+        on_task_done=_get_mark_done(manifest, "turb_file_path"),
+    )
+
+
+def create_turbulence_file(
+    instruction_file_path,
+    turb_file_path,
+    plane_parameters,
+    turbulence_mean_length=180,
+    turbulence_part=0.05,
+    sampling_frequency=100,
+    turbulence_level=2,
+    seed=None,
+    spectrum_cache=None,
+    block_duration=None,
+    max_segment_duration=600,
+    file_format="csv",
+    dtype=np.float64,
+    file_dtype=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    profiler=None,
+    write_events=False,
+    step_delta_t=None,
+):
+    """
+    Creates the turbulence file of a single flight (see create_turbulence_files).
+    The file is written atomically: it only appears at turb_file_path once complete.
+    Parameters :
+    - instruction_file_path: path to the flight instruction file
+    - turb_file_path: path of the turbulence file to create
+    - seed: master seed, combined with the flight name to seed the flight random generator
+    The other parameters are described in create_turbulence_files.
     """
-    file_paths = instruction_dir_path.glob("*.csv")
-    for file_path in file_paths:
-        turb_file_path = turbulence_dir_path / (file_path.name[:-4] + "_turbwind.csv")
-        if not turb_file_path.exists():
-            print(f"Creating turbulence file for flight {file_path.name[:-4]}")
-            safire_data = pd.read_csv(file_path)
-            turbulence_data = create_turbulence_complete_flight(
+    flight_name = instruction_file_path.name[:-4]
+    print(f"Creating turbulence file for flight {flight_name}")
+    with profiling.activate(profiler, flight_name):
+        with profiling.stage("read_instructions"):
+            safire_data = pd.read_csv(instruction_file_path)
+        parameters = {
+            "turbulence_mean_length": turbulence_mean_length,
+            "turbulence_part": turbulence_part,
+            "sampling_frequency": sampling_frequency,
+            "turbulence_level": turbulence_level,
+            "spectrum_cache": spectrum_cache,
+            "rng": get_flight_rng(seed, flight_name),
+            "max_segment_duration": max_segment_duration,
+            "synthesis": synthesis,
+            "synthesis_block_duration": synthesis_block_duration,
+            "dtype": dtype,
+        }
+        if file_dtype is None:
+            file_dtype = dtype
+        # The events are built while the file is written, without keeping the flags
+        events = EventListBuilder() if write_events else None
+        step_table = _get_step_table_builder(safire_data, step_delta_t)
+        if block_duration is None:
+            with profiling.stage("generate"):
+                turbulence_data = create_turbulence_complete_flight(
+                    safire_data, plane_parameters, **parameters
+                )
+            turbulence_data = _to_file_layout(turbulence_data)
+            with profiling.stage("write"):
+                write_table(
+                    turbulence_data,
+                    turb_file_path,
+                    file_format=file_format,
+                    dtype=file_dtype,
+                )
+            if write_events:
+                events.add_samples(
+                    turbulence_data["timestamp"], turbulence_data["turbulence"]
+                )
+            if step_table is not None:
+                step_table.add_rows(turbulence_data)
+        else:
+            blocks = iter_turbulence_complete_flight(
                 safire_data,
                 plane_parameters,
-                turbulence_mean_length=turbulence_mean_length,
-                turbulence_part=turbulence_part,
-                sampling_frequency=sampling_frequency,
-                turbulence_level=turbulence_level,
+                block_duration=block_duration,
+                **parameters,
             )
-            turbulence_data["timestamp"] = turbulence_data.index
-            turbulence_data = turbulence_data[
-                ["timestamp", "turbulence", "u", "v", "w", "p", "q", "r"]
-            ]  # Reorder columns
-            turbulence_data.to_csv(turb_file_path, index=False)
+            # The blocks are generated while the file is written
+            with profiling.stage("generate_and_write"):
+                write_table_blocks(
+                    _file_layout_blocks(blocks, events, step_table),
+                    turb_file_path,
+                    get_flight_duration(safire_data) * sampling_frequency,
+                    file_format=file_format,
+                    dtype=file_dtype,
+                )
+        profiling.add_bytes("write", turb_file_path.stat().st_size)
+        if write_events:
+            events_file_path = turb_file_path.with_name(
+                flight_name + "_turbulence_events.csv"
+            )
+            with profiling.stage("write"):
+                events.to_event_list().write_csv(events_file_path)
+            profiling.add_bytes("write", events_file_path.stat().st_size)
+        if step_table is not None:
+            _write_step_table(step_table, turb_file_path, file_format)
+
+
+def _get_step_table_builder(safire_data, step_delta_t):
+    """
+    Returns the step table builder of a flight (see step_table.StepTableBuilder), or None
+    without step table.
+    """
+    if step_delta_t is None:
+        return None
+    return StepTableBuilder(
+        get_nb_simulation_steps(safire_data["timestamp"].iloc[-1], step_delta_t),
+        step_delta_t,
+    )
+
+
+def _write_step_table(step_table, turbulence_file_path, file_format):
+    with profiling.stage("write"):
+        step_table_path = step_table.write(
+            turbulence_file_path, file_format=file_format
+        )
+    profiling.add_bytes("write", step_table_path.stat().st_size)
+
+
+def get_flight_duration(safire_data):
+    """
+    Returns the duration of the turbulence generated for a flight plan, in seconds.
+    """
+    return (
+        int(safire_data["timestamp"].max()) + 1
+    )  # Adding one second to avoid rounding problems at the end of the simulation
+
+
+def _to_file_layout(turbulence_data):
+    """
+    Returns the turbulence dataframe with the timestamp column and the column order of the
+    turbulence files.
+    """
+    turbulence_data["timestamp"] = turbulence_data.index
+    return turbulence_data[
+        ["timestamp", "turbulence", "u", "v", "w", "p", "q", "r"]
+    ]  # Reorder columns
+
+
+def _file_layout_blocks(blocks, events=None, step_table=None):
+    """
+    Yields the blocks in the file layout. If events is an event_list.EventListBuilder, the
+    turbulence flags of each block are added to it, and if step_table is a
+    step_table.StepTableBuilder, the rows of each block are added to it.
+    """
+    for block in blocks:
+        block = _to_file_layout(block)
+        if events is not None:
+            events.add_samples(block["timestamp"], block["turbulence"])
+        if step_table is not None:
+            step_table.add_rows(block)
+        yield block
 
 
 def create_calm_conditions_files(
@@ -83,6 +332,17 @@ def create_calm_conditions_files(
     parameter_actualisation_period=180,
     sampling_frequency=100,
     turbulence_level=0,
+    spectrum_cache=None,
+    workers=1,
+    seed=None,
+    file_format="csv",
+    dtype=np.float64,
+    file_dtype=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    profiler=None,
+    step_delta_t=None,
+    manifest=None,
 ):
     """
     Creates calm condition files.
@@ -96,27 +356,222 @@ def create_calm_conditions_files(
     - sampling_frequency: turbulence sampling frequency
     - turbulence_level: turbulence level during the complete flight. Possible turbulence levels
     are 0 (calm conditions), 1 (light), 2 (moderate) and 3 (severe).
+    - spectrum_cache: optional spectrum_cache.SpectrumCache shared by all the flights. With
+    several workers, each worker process uses its own copy of the cache.
+    - workers: number of processes generating the flights in parallel
+    - seed: master seed. The random generator of each flight is derived from the master seed and
+    the flight name (see get_flight_rng), so the files do not depend on the number of workers.
+    - file_format: format of the files, “csv”, “npy” or “bin” (see turbulence_io)
+    - dtype: float type of the generated turbulence (np.float32 or np.float64, see
+    create_turbulence_complete_flight)
+    - file_dtype: float type of the values in binary files (np.float32 or np.float64), dtype by
+    default
+    - synthesis: “segments” or “overlap_add” (see create_turbulence_complete_flight)
+    - synthesis_block_duration: duration of the blocks of the “overlap_add” synthesis, in seconds
+    - profiler: optional profiling.StageProfiler recording the time spent in each generation stage
+    and the bytes written, per flight
+    - step_delta_t: if given, a step table for a simulation time step of step_delta_t seconds is
+    written next to each file (see step_table)
+    - manifest: optional build_manifest.BuildManifest, see create_turbulence_files
     """
-    file_paths = instruction_dir_path.glob("*.csv")
-    for file_path in file_paths:
+    tasks = list()
+    for file_path in instruction_dir_path.glob("*.csv"):
         conditions_file_path = wind_conditions_dir_path / (
-            file_path.name[:-4] + "_calmwind.csv"
+            file_path.name[:-4] + "_calmwind" + FILE_EXTENSIONS[file_format]
         )
-        if not conditions_file_path.exists():
-            safire_data = pd.read_csv(file_path)
+        tasks.append(
+            {
+                "instruction_file_path": file_path,
+                "conditions_file_path": conditions_file_path,
+                "plane_parameters": plane_parameters,
+                "parameter_actualisation_period": parameter_actualisation_period,
+                "sampling_frequency": sampling_frequency,
+                "turbulence_level": turbulence_level,
+                "seed": seed,
+                "file_format": file_format,
+                "dtype": dtype,
+                "file_dtype": file_dtype,
+                "synthesis": synthesis,
+                "synthesis_block_duration": synthesis_block_duration,
+                "step_delta_t": step_delta_t,
+            }
+        )
+    run_flight_tasks(
+        create_calm_conditions_file,
+        _select_tasks(tasks, "conditions_file_path", manifest, spectrum_cache),
+        workers,
+        spectrum_cache,
+        profiler,
+        on_task_done=_get_mark_done(manifest, "conditions_file_path"),
+    )
+
+
+def create_calm_conditions_file(
+    instruction_file_path,
+    conditions_file_path,
+    plane_parameters,
+    parameter_actualisation_period=180,
+    sampling_frequency=100,
+    turbulence_level=0,
+    seed=None,
+    spectrum_cache=None,
+    file_format="csv",
+    dtype=np.float64,
+    file_dtype=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    profiler=None,
+    step_delta_t=None,
+):
+    """
+    Creates the calm conditions file of a single flight (see create_calm_conditions_files).
+    The file is written atomically: it only appears at conditions_file_path once complete.
+    Parameters :
+    - instruction_file_path: path to the flight instruction file
+    - conditions_file_path: path of the calm conditions file to create
+    - seed: master seed, combined with the flight name to seed the flight random generator
+    The other parameters are described in create_calm_conditions_files.
+    """
+    with profiling.activate(profiler, instruction_file_path.name[:-4]):
+        with profiling.stage("read_instructions"):
+            safire_data = pd.read_csv(instruction_file_path)
+        with profiling.stage("generate"):
             wind_data = create_calm_conditions_complete_flight(
                 safire_data,
                 plane_parameters,
                 parameter_actualisation_period=parameter_actualisation_period,
                 sampling_frequency=sampling_frequency,
                 turbulence_level=turbulence_level,
+                spectrum_cache=spectrum_cache,
+                rng=get_flight_rng(seed, instruction_file_path.name[:-4]),
+                synthesis=synthesis,
+                synthesis_block_duration=synthesis_block_duration,
+                dtype=dtype,
             )
+        with profiling.stage("write"):
             wind_data["timestamp"] = wind_data.index
             wind_data["turbulence"] = 0
             wind_data = wind_data[
                 ["timestamp", "turbulence", "u", "v", "w", "p", "q", "r"]
             ]
-            wind_data.to_csv(conditions_file_path, index=False)
+            write_table(
+                wind_data,
+                conditions_file_path,
+                file_format=file_format,
+                dtype=dtype if file_dtype is None else file_dtype,
+            )
+        profiling.add_bytes("write", conditions_file_path.stat().st_size)
+        step_table = _get_step_table_builder(safire_data, step_delta_t)
+        if step_table is not None:
+            step_table.add_rows(wind_data)
+            _write_step_table(step_table, conditions_file_path, file_format)
+
+
+def run_flight_tasks(
+    task_function,
+    tasks,
+    workers,
+    spectrum_cache=None,
+    profiler=None,
+    on_task_done=None,
+):
+    """
+    Calls task_function(**task, spectrum_cache=spectrum_cache, profiler=profiler) for each task
+    of the tasks list, either sequentially (workers=1) or in a pool of worker processes.
+    Each worker process receives a copy of spectrum_cache when it starts, that it reuses for all
+    its tasks. With a profiler, each task is profiled in its worker process and the stages are
+    merged in profiler.
+    If given, on_task_done(task) is called in the calling process after each completed task.
+    """
+    if workers == 1:
+        for task in tasks:
+            task_function(**task, spectrum_cache=spectrum_cache, profiler=profiler)
+            if on_task_done is not None:
+                on_task_done(task)
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(spectrum_cache,),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_in_worker, task_function, task, profiler is not None
+            ): task
+            for task in tasks
+        }
+        for future in as_completed(futures):
+            flights = future.result()
+            if profiler is not None:
+                profiler.merge(flights)
+            if on_task_done is not None:
+                on_task_done(futures[future])
+
+
+def _select_tasks(tasks, output_key, manifest, spectrum_cache):
+    """
+    Returns the tasks to run. Without manifest, the tasks whose output file (task[output_key])
+    does not exist. With a build_manifest.BuildManifest, the tasks whose output is not up to
+    date, which are recorded as started. The tasks without seed are always run.
+    """
+    if manifest is None:
+        return [task for task in tasks if not task[output_key].exists()]
+    code_version = get_code_version(GENERATION_SOURCES)
+    selected_tasks = list()
+    for task in tasks:
+        # The block durations only bound the memory used, they do not change the files
+        parameters = {
+            key: value
+            for key, value in task.items()
+            if key
+            not in ("instruction_file_path", output_key, "seed", "block_duration")
+        }
+        parameters["dtype"] = np.dtype(parameters["dtype"]).name
+        if parameters["file_dtype"] is None:
+            parameters["file_dtype"] = parameters["dtype"]
+        parameters["file_dtype"] = np.dtype(parameters["file_dtype"]).name
+        if spectrum_cache is not None:
+            parameters["spectrum_cache_resolutions"] = [
+                spectrum_cache.v_resolution,
+                spectrum_cache.h_resolution,
+            ]
+        build = (
+            task[output_key],
+            task["instruction_file_path"],
+            parameters,
+            task["seed"],
+            code_version,
+        )
+        if task["seed"] is None or not manifest.is_up_to_date(*build):
+            manifest.mark_started(*build)
+            selected_tasks.append(task)
+    return selected_tasks
+
+
+def _get_mark_done(manifest, output_key):
+    if manifest is None:
+        return None
+
+    def mark_done(task):
+        # Without seed, the output cannot be reproduced, it is left stale
+        if task["seed"] is not None:
+            manifest.mark_done(task[output_key])
+
+    return mark_done
+
+
+_worker_spectrum_cache = None
+
+
+def _init_worker(spectrum_cache):
+    global _worker_spectrum_cache
+    _worker_spectrum_cache = spectrum_cache
+
+
+def _run_in_worker(task_function, task, profile):
+    profiler = profiling.StageProfiler() if profile else None
+    task_function(**task, spectrum_cache=_worker_spectrum_cache, profiler=profiler)
+    return profiler.flights if profile else None
 
 
 def create_turbulence_complete_flight(
@@ -127,6 +582,12 @@ def create_turbulence_complete_flight(
     sampling_frequency=100,
     transition_duration=3,
     turbulence_level=2,
+    spectrum_cache=None,
+    rng=None,
+    max_segment_duration=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    dtype=np.float64,
 ):
     """
     Creates a dataframe containing turbulence.
@@ -134,7 +595,8 @@ def create_turbulence_complete_flight(
     The turbulence column is binary and indicates whether turbulence is occurring.
     The u, v and w columns are the turbulence wind components.
     The p, q and r columns are the fictitious rotation speeds induced by turbulence.
-    Turbulence is generated using the generate_3d_turbulence function.
+    The turbulence segments are synthesized by batches (see generate_turbulence_batch), or
+    continuously by the “overlap_add” synthesis (see generate_nonstationary_turbulence).
     The function's attributes are as follows:
     - safire_data: dataframe containing flight instructions
     - plane_parameters: dictionary of aircraft parameters to be taken into account for turbulence
@@ -146,142 +608,585 @@ def create_turbulence_complete_flight(
     seconds. The transition is the function f(x)=0.5*(1-cos(pi*x/transition_duration)).
     - turbulence_level: turbulence level during turbulence. Possible turbulence levels
     are 1 (light), 2 (moderate) and 3 (severe).
+    - spectrum_cache: optional spectrum_cache.SpectrumCache. The speed and altitude of each
+    segment are then quantized to the cache resolution.
+    - rng: numpy random generator (np.random.Generator) or seed
+    - max_segment_duration: maximal duration of a generated segment in seconds, longer segments
+    are split (see get_turbulence_segments). None to generate each segment in one piece.
+    - synthesis: “segments” to generate each segment with the mean speed and altitude over the
+    segment, or “overlap_add” to make the spectrum follow the speed and altitude of the flight
+    plan continuously (see generate_nonstationary_turbulence)
+    - synthesis_block_duration: duration of the blocks of the “overlap_add” synthesis, in seconds
+    - dtype: float type of the turbulence (np.float32 or np.float64). With np.float32, the
+    spectra are synthesized in single precision and the arrays take half the memory.
 
-    Algo principle: create a turbulence dataframe and a non-turbulence dataframe,
-    then merge them, taking transitions into account.
+    Algo principle: create a turbulence array and a non-turbulence array, then merge them,
+    taking transitions into account. The segments are written in preallocated arrays, the
+    dataframe is only built at the end.
     """
-    flight_duration = (
-        int(safire_data["timestamp"].max()) + 1
-    )  # Adding one second to avoid rounding problems at the end of the simulation
-    turb_data = pd.DataFrame(
-        index=np.around(
-            np.linspace(
-                0,
-                flight_duration - 1 / sampling_frequency,
-                flight_duration * sampling_frequency,
-            ),
-            6,
-        ),  # Rounding to the microsecond to avoid index problems related to rounding
-        columns=["turbulence", "u", "v", "w", "p", "q", "r"],
-        data=0.0,
+    rng = np.random.default_rng(rng)
+    flight_profile = _get_flight_profile(safire_data, synthesis)
+    flight_duration, turbulence_start_times, turbulence_durations, segments = (
+        _plan_turbulence_flight(
+            safire_data,
+            turbulence_mean_length,
+            turbulence_part,
+            transition_duration,
+            max_segment_duration,
+            rng,
+        )
     )
-    no_turb_data = turb_data.copy(deep=True)
-    turbulence_start_times, turbulence_durations = generate_turbulence_times(
-        flight_duration, turbulence_mean_length, turbulence_part
+    nb_samples = flight_duration * sampling_frequency
+    # Columns u, v, w, p, q, r and turbulence, segments are written by sample offset
+    turb_data = np.zeros((nb_samples, 7), dtype=dtype)
+    no_turb_data = np.zeros((nb_samples, 6), dtype=dtype)
+    for segment_index, segment in enumerate(segments):
+        segment_data = _synthesize_segment(
+            segment,
+            plane_parameters,
+            sampling_frequency,
+            turbulence_level,
+            spectrum_cache,
+            get_segment_rng(rng, segment_index),
+            flight_profile,
+            synthesis_block_duration,
+            dtype,
+        )
+        _write_segment_to_layers(
+            turb_data, no_turb_data, segment, segment_data, 0, sampling_frequency
+        )
+        del segment_data
+    # Fusion des turbulences et non-turbulences, dans turb_data pour ne pas copier les données
+    with profiling.stage("merge"):
+        coefs = get_transition_coefficients(
+            turb_data[:, 6],
+            turbulence_start_times,
+            turbulence_durations,
+            transition_duration,
+            sampling_frequency,
+        )
+        blend(turb_data[:, :6], no_turb_data, coefs, out=turb_data[:, :6])
+    del no_turb_data
+    return pd.DataFrame(
+        index=time_index(0, nb_samples, sampling_frequency),
+        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+        data=turb_data,
     )
-    no_turb_dfs = list()
-    turb_dfs = list()
+
+
+def iter_turbulence_complete_flight(
+    safire_data,
+    plane_parameters,
+    turbulence_mean_length=180,
+    turbulence_part=0.02,
+    sampling_frequency=100,
+    transition_duration=3,
+    turbulence_level=2,
+    spectrum_cache=None,
+    rng=None,
+    block_duration=60,
+    max_segment_duration=600,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    dtype=np.float64,
+):
+    """
+    Generator version of create_turbulence_complete_flight, yielding the flight turbulence in
+    consecutive dataframes of block_duration seconds (the last block can be shorter). The blocks
+    have the same columns and index as the dataframe of create_turbulence_complete_flight.
+    The segments are generated lazily, when the first block they overlap is reached, and released
+    as soon as the blocks they overlap are yielded. The transitions between
+    turbulence and non-turbulence are computed over the whole flight, so they are continuous
+    across block boundaries.
+    The memory used is bounded by the block duration and max_segment_duration, not by the flight
+    duration. With the same rng and max_segment_duration, the concatenated blocks are identical to
+    the output of create_turbulence_complete_flight.
+    Parameters :
+    - block_duration: duration of the yielded blocks, in seconds
+    - max_segment_duration: maximal duration of a generated segment in seconds (see
+    get_turbulence_segments). None to generate each segment in one piece, in which case the memory
+    is bounded by the longest segment.
+    The other parameters are described in create_turbulence_complete_flight.
+    """
+    rng = np.random.default_rng(rng)
+    flight_profile = _get_flight_profile(safire_data, synthesis)
+    flight_duration, turbulence_start_times, turbulence_durations, segments = (
+        _plan_turbulence_flight(
+            safire_data,
+            turbulence_mean_length,
+            turbulence_part,
+            transition_duration,
+            max_segment_duration,
+            rng,
+        )
+    )
+    nb_samples = flight_duration * sampling_frequency
+    block_size = int(block_duration * sampling_frequency)
+    # Each segment has its own random generator, so the segments are generated in the order of
+    # their start, when the first block they overlap is reached.
+    segment_order = sorted(
+        range(len(segments)), key=lambda segment_index: segments[segment_index]["start"]
+    )
+    next_segment = 0
+    live_segments = list()
+    for block_start in range(0, nb_samples, block_size):
+        block_end = min(block_start + block_size, nb_samples)
+        while (
+            next_segment < len(segments)
+            and segments[segment_order[next_segment]]["start"] * sampling_frequency
+            < block_end
+        ):
+            segment_index = segment_order[next_segment]
+            segment_data = _synthesize_segment(
+                segments[segment_index],
+                plane_parameters,
+                sampling_frequency,
+                turbulence_level,
+                spectrum_cache,
+                get_segment_rng(rng, segment_index),
+                flight_profile,
+                synthesis_block_duration,
+                dtype,
+            )
+            live_segments.append((segment_index, segment_data))
+            next_segment += 1
+        live_segments.sort(key=lambda live_segment: live_segment[0])
+        yield _merge_turbulence_block(
+            [
+                (segments[segment_index], segment_data)
+                for segment_index, segment_data in live_segments
+            ],
+            block_start,
+            block_end,
+            turbulence_start_times,
+            turbulence_durations,
+            transition_duration,
+            sampling_frequency,
+            flight_duration,
+            dtype,
+        )
+        live_segments = [
+            (segment_index, segment_data)
+            for segment_index, segment_data in live_segments
+            if (segments[segment_index]["start"] + segments[segment_index]["duration"])
+            * sampling_frequency
+            > block_end
+        ]
+
+
+def create_turbulence_window(
+    safire_data,
+    plane_parameters,
+    start_time,
+    end_time,
+    turbulence_mean_length=180,
+    turbulence_part=0.02,
+    sampling_frequency=100,
+    transition_duration=3,
+    turbulence_level=2,
+    spectrum_cache=None,
+    rng=None,
+    max_segment_duration=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    dtype=np.float64,
+):
+    """
+    Returns the part [start_time, end_time) of the flight turbulence, identical to the same rows
+    of create_turbulence_complete_flight with the same parameters and rng.
+    Only the turbulence times and the segments overlapping the window are generated: each
+    segment has its own random generator (see get_segment_rng). With max_segment_duration, the
+    cost of a window does not depend on the flight duration.
+    The window is clipped to the flight duration.
+    Parameters :
+    - start_time: start time of the window, s
+    - end_time: end time of the window (excluded), s
+    The other parameters are described in create_turbulence_complete_flight.
+    """
+    rng = np.random.default_rng(rng)
+    flight_profile = _get_flight_profile(safire_data, synthesis)
+    flight_duration, turbulence_start_times, turbulence_durations, segments = (
+        _plan_turbulence_flight(
+            safire_data,
+            turbulence_mean_length,
+            turbulence_part,
+            transition_duration,
+            max_segment_duration,
+            rng,
+        )
+    )
+    nb_samples = flight_duration * sampling_frequency
+    # First samples at or after the times, without the rounding errors of the products
+    window_start, window_end = np.ceil(
+        np.around(np.array([start_time, end_time]) * sampling_frequency, 6)
+    ).astype(int)
+    window_start = min(max(window_start, 0), nb_samples)
+    window_end = min(max(window_end, window_start), nb_samples)
+    window_segments = list()
+    for segment_index, segment in enumerate(segments):
+        segment_start = segment["start"] * sampling_frequency
+        segment_end = segment_start + segment["duration"] * sampling_frequency
+        if segment_start < window_end and segment_end > window_start:
+            segment_data = _synthesize_segment(
+                segment,
+                plane_parameters,
+                sampling_frequency,
+                turbulence_level,
+                spectrum_cache,
+                get_segment_rng(rng, segment_index),
+                flight_profile,
+                synthesis_block_duration,
+                dtype,
+            )
+            window_segments.append((segment, segment_data))
+    return _merge_turbulence_block(
+        window_segments,
+        window_start,
+        window_end,
+        turbulence_start_times,
+        turbulence_durations,
+        transition_duration,
+        sampling_frequency,
+        flight_duration,
+        dtype,
+    )
+
+
+def turbulence_window(
+    instruction_file_path,
+    plane_parameters,
+    seed,
+    start_time,
+    end_time,
+    turbulence_mean_length=180,
+    turbulence_part=0.05,
+    sampling_frequency=100,
+    turbulence_level=2,
+    spectrum_cache=None,
+    max_segment_duration=600,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    dtype=np.float64,
+):
+    """
+    Returns the rows [start_time, end_time) of the turbulence file that create_turbulence_file
+    would create for a flight with the same master seed and parameters, without generating nor
+    reading the complete file. The flight is identified by its instruction file, whose name gives
+    the flight random generator (see get_flight_rng).
+    The returned dataframe has the columns of the turbulence files (see create_turbulence_files).
+    """
+    turbulence_data = create_turbulence_window(
+        pd.read_csv(instruction_file_path),
+        plane_parameters,
+        start_time,
+        end_time,
+        turbulence_mean_length=turbulence_mean_length,
+        turbulence_part=turbulence_part,
+        sampling_frequency=sampling_frequency,
+        turbulence_level=turbulence_level,
+        spectrum_cache=spectrum_cache,
+        rng=get_flight_rng(seed, instruction_file_path.name[:-4]),
+        max_segment_duration=max_segment_duration,
+        synthesis=synthesis,
+        synthesis_block_duration=synthesis_block_duration,
+        dtype=dtype,
+    )
+    return _to_file_layout(turbulence_data).reset_index(drop=True)
+
+
+def get_segment_rng(rng, segment_index):
+    """
+    Returns the random generator of the segment segment_index of a flight, derived from the
+    seed sequence of the flight random generator rng. The segment streams are independent from
+    each other and from the stream of rng, which draws the turbulence times, so any segment can be
+    generated on its own.
+    """
+    seed_sequence = rng.bit_generator.seed_seq
+    if not isinstance(seed_sequence, np.random.SeedSequence):
+        raise ValueError("The flight random generator must be seeded by a SeedSequence")
+    return np.random.default_rng(
+        np.random.SeedSequence(
+            seed_sequence.entropy,
+            spawn_key=seed_sequence.spawn_key + (SEGMENT_STREAM, segment_index),
+            pool_size=seed_sequence.pool_size,
+        )
+    )
+
+
+def _merge_turbulence_block(
+    segments,
+    block_start,
+    block_end,
+    turbulence_start_times,
+    turbulence_durations,
+    transition_duration,
+    sampling_frequency,
+    flight_duration,
+    dtype=np.float64,
+):
+    """
+    Returns the dataframe of the samples [block_start, block_end) of the flight, from the
+    (segment, segment_data) pairs overlapping the block, in generation order.
+    """
+    turb_block = np.zeros((block_end - block_start, 7), dtype=dtype)
+    no_turb_block = np.zeros((block_end - block_start, 6), dtype=dtype)
+    for segment, segment_data in segments:
+        _write_segment_to_layers(
+            turb_block,
+            no_turb_block,
+            segment,
+            segment_data,
+            block_start,
+            sampling_frequency,
+        )
+    with profiling.stage("merge"):
+        coefs = get_transition_coefficients(
+            turb_block[:, 6],
+            turbulence_start_times,
+            turbulence_durations,
+            transition_duration,
+            sampling_frequency,
+            first_sample=block_start,
+            flight_duration=flight_duration,
+        )
+        blend(turb_block[:, :6], no_turb_block, coefs, out=turb_block[:, :6])
+    return pd.DataFrame(
+        index=time_index(
+            block_start / sampling_frequency,
+            block_end - block_start,
+            sampling_frequency,
+        ),
+        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+        data=turb_block,
+    )
+
+
+def _plan_turbulence_flight(
+    safire_data,
+    turbulence_mean_length,
+    turbulence_part,
+    transition_duration,
+    max_segment_duration,
+    rng,
+):
+    """
+    Draws the turbulence times of a flight with the rng generator and returns the flight
+    duration, the turbulence start times and durations and the segments to generate.
+    """
+    with profiling.stage("plan"):
+        flight_duration = get_flight_duration(safire_data)
+        turbulence_start_times, turbulence_durations = generate_turbulence_times(
+            flight_duration, turbulence_mean_length, turbulence_part, rng=rng
+        )
+        segments = get_turbulence_segments(
+            safire_data,
+            flight_duration,
+            turbulence_start_times,
+            turbulence_durations,
+            transition_duration,
+            max_segment_duration=max_segment_duration,
+        )
+        return flight_duration, turbulence_start_times, turbulence_durations, segments
+
+
+def _get_flight_profile(safire_data, synthesis):
+    """
+    Returns the times, speeds and altitudes of the flight plan used by the “overlap_add”
+    synthesis, or None for the “segments” synthesis.
+    """
+    if synthesis == "segments":
+        return None
+    if synthesis != "overlap_add":
+        raise ValueError(f"Unknown synthesis: {synthesis}")
+    return (
+        safire_data["timestamp"].to_numpy(dtype=float),
+        safire_data["platform_speed_wrt_air : from pitot (m/s)"].to_numpy(dtype=float),
+        safire_data["altitude : from GPS (meter)"].to_numpy(dtype=float),
+    )
+
+
+def _synthesize_segment(
+    segment,
+    plane_parameters,
+    sampling_frequency,
+    turbulence_level,
+    spectrum_cache,
+    rng,
+    flight_profile=None,
+    synthesis_block_duration=120,
+    dtype=np.float64,
+):
+    """
+    Returns the (N, 6) turbulence of a segment of get_turbulence_segments.
+    Without flight_profile, the segment is generated with its mean speed and altitude. Otherwise
+    it follows the (times, speeds, altitudes) flight_profile (see
+    generate_nonstationary_turbulence).
+    """
+    N = segment["duration"] * sampling_frequency
+    if flight_profile is not None:
+        return generate_nonstationary_turbulence(
+            *flight_profile,
+            plane_parameters,
+            segment["start"] * sampling_frequency,
+            N,
+            sampling_frequency,
+            turbulence_level if segment["is_turbulence"] else 0,
+            block_duration=synthesis_block_duration,
+            spectrum_cache=spectrum_cache,
+            rng=rng,
+            dtype=dtype,
+        )
+    magnitudes = get_turbulence_magnitudes(
+        segment["v"],
+        segment["h"],
+        plane_parameters,
+        N,
+        sampling_frequency,
+        turbulence_level if segment["is_turbulence"] else 0,
+        spectrum_cache=spectrum_cache,
+    )
+    return synthesize_from_magnitudes(magnitudes, N, rng=rng, dtype=dtype).T
+
+
+def _write_segment_to_layers(
+    turb_data, no_turb_data, segment, segment_data, first_row_sample, sampling_frequency
+):
+    """
+    Writes a generated segment in the turbulence (u, v, w, p, q, r and turbulence columns) or in
+    the non-turbulence (u, v, w, p, q and r columns) array. The first row of the arrays
+    corresponds to the sample first_row_sample of the flight.
+    """
+    first_sample = segment["start"] * sampling_frequency - first_row_sample
+    fade_in = segment["fade_in"] * sampling_frequency
+    if segment["is_turbulence"]:
+        write_segment(turb_data[:, :6], segment_data, first_sample, fade_in)
+        write_segment(
+            turb_data[:, 6:], np.ones((segment_data.shape[0], 1)), first_sample
+        )
+    else:
+        write_segment(no_turb_data, segment_data, first_sample, fade_in)
+
+
+def get_turbulence_segments(
+    safire_data,
+    flight_duration,
+    turbulence_start_times,
+    turbulence_durations,
+    transition_duration,
+    max_segment_duration=None,
+):
+    """
+    Returns the list of segments to generate for a complete flight, in generation order.
+    Each segment is a dictionary with the keys:
+    - start: start time of the segment, s
+    - duration: duration of the segment, s
+    - v: mean aircraft speed used for the turbulence parameters, m.s-1
+    - h: mean altitude used for the turbulence parameters, m
+    - is_turbulence: True for turbulence segments, False for non-turbulence segments
+    - fade_in: duration of the linear fade from the previous segment of the same kind, s
+    Non-turbulence segments extend transition_duration seconds into the surrounding turbulence
+    so that the transitions can be computed. When segments of the same kind overlap, the last
+    one in the list prevails, apart from its fade_in part.
+    If max_segment_duration is given, the periods longer than max_segment_duration are split into
+    consecutive segments overlapping by transition_duration, each one using the mean speed and
+    altitude over its own interval and fading in from the previous one.
+    """
+    if max_segment_duration is not None and max_segment_duration <= transition_duration:
+        raise ValueError("max_segment_duration must be longer than transition_duration")
     v_series = safire_data["platform_speed_wrt_air : from pitot (m/s)"]
     h_series = safire_data["altitude : from GPS (meter)"]
-    # Creation of the first non-turbulence period (if necessary)
+    segments = list()
+
+    def add_segment(start, duration, params_start, params_end, is_turbulence):
+        end = start + duration
+        piece_start = start
+        while True:
+            if (
+                max_segment_duration is None
+                or end - piece_start <= max_segment_duration
+            ):
+                piece_end = end
+            else:
+                piece_end = piece_start + max_segment_duration
+            piece_params_start = max(params_start, piece_start)
+            piece_params_end = min(params_end, piece_end)
+            if piece_params_start >= piece_params_end:
+                piece_params_start, piece_params_end = params_start, params_end
+            segments.append(
+                {
+                    "start": piece_start,
+                    "duration": piece_end - piece_start,
+                    "v": v_series.iloc[piece_params_start:piece_params_end].mean(),
+                    "h": h_series.iloc[piece_params_start:piece_params_end].mean(),
+                    "is_turbulence": is_turbulence,
+                    "fade_in": 0 if piece_start == start else transition_duration,
+                }
+            )
+            if piece_end == end:
+                break
+            piece_start = piece_end - transition_duration
+
+    # First non-turbulence period (if necessary)
     if turbulence_start_times[0] != 0:
-        first_no_turb = create_turbulence_df(
-            v_series.iloc[0 : turbulence_start_times[0]].mean(),
-            h_series.iloc[0 : turbulence_start_times[0]].mean(),
-            plane_parameters,
+        add_segment(
             0,
             turbulence_start_times[0] + transition_duration,
-            sampling_frequency,
+            0,
+            turbulence_start_times[0],
             False,
-            turbulence_level=turbulence_level,
         )
-        no_turb_data.update(first_no_turb)
-        no_turb_dfs.append(first_no_turb)
-    # Creation of the turbulence and non-turbulence periods in the middle of the flight
+    # Turbulence and non-turbulence periods in the middle of the flight
     for i in range(len(turbulence_start_times) - 1):
-        turb_df = create_turbulence_df(
-            v_series.iloc[
-                turbulence_start_times[i] : turbulence_start_times[i]
-                + turbulence_durations[i]
-            ].mean(),
-            h_series.iloc[
-                turbulence_start_times[i] : turbulence_start_times[i]
-                + turbulence_durations[i]
-            ].mean(),
-            plane_parameters,
+        turbulence_end_time = turbulence_start_times[i] + turbulence_durations[i]
+        add_segment(
             turbulence_start_times[i],
             turbulence_durations[i],
-            sampling_frequency,
+            turbulence_start_times[i],
+            turbulence_end_time,
             True,
-            turbulence_level=turbulence_level,
         )
-        turb_data.update(turb_df)
-        turb_dfs.append(turb_df)
-        v = v_series.iloc[
-            turbulence_start_times[i]
-            + turbulence_durations[i] : turbulence_start_times[i + 1]
-        ].mean()
-        h = h_series.iloc[
-            turbulence_start_times[i]
-            + turbulence_durations[i] : turbulence_start_times[i + 1]
-        ].mean()
-        after_turbulence_df = create_turbulence_df(
-            v,
-            h,
-            plane_parameters,
-            turbulence_start_times[i] + turbulence_durations[i] - transition_duration,
+        add_segment(
+            turbulence_end_time - transition_duration,
             turbulence_start_times[i + 1]
             - turbulence_start_times[i]
             + 2 * transition_duration,
-            sampling_frequency,
+            turbulence_end_time,
+            turbulence_start_times[i + 1],
             False,
-            turbulence_level=turbulence_level,
         )
-        no_turb_data.update(after_turbulence_df)
-        no_turb_dfs.append(after_turbulence_df)
-    # Creation of the last turbulence period and the last non-turbulence period (if necessary)
-    turbulence_start_time = turbulence_start_times[-1]
-    turbulence_duration = turbulence_durations[-1]
-    v = v_series.iloc[
-        turbulence_start_time : turbulence_start_time + turbulence_duration
-    ].mean()
-    h = h_series.iloc[
-        turbulence_start_time : turbulence_start_time + turbulence_duration
-    ].mean()
-    turb_df = create_turbulence_df(
-        v,
-        h,
-        plane_parameters,
-        turbulence_start_time,
-        turbulence_duration,
-        sampling_frequency,
+    # Last turbulence period and last non-turbulence period (if necessary)
+    turbulence_end_time = turbulence_start_times[-1] + turbulence_durations[-1]
+    add_segment(
+        turbulence_start_times[-1],
+        turbulence_durations[-1],
+        turbulence_start_times[-1],
+        turbulence_end_time,
         True,
-        turbulence_level=turbulence_level,
     )
-    turb_data.update(turb_df)
-    turb_dfs.append(turb_df)
-    if flight_duration - turbulence_start_time - turbulence_duration != 0:
-        v = v_series.iloc[
-            turbulence_start_time + turbulence_duration : flight_duration
-        ].mean()
-        h = h_series.iloc[
-            turbulence_start_time + turbulence_duration : flight_duration
-        ].mean()
-        after_turbulence_df = create_turbulence_df(
-            v,
-            h,
-            plane_parameters,
-            turbulence_start_time + turbulence_duration - transition_duration,
-            flight_duration
-            - turbulence_start_time
-            - turbulence_duration
-            + transition_duration,
-            sampling_frequency,
+    if flight_duration - turbulence_end_time != 0:
+        add_segment(
+            turbulence_end_time - transition_duration,
+            flight_duration - turbulence_end_time + transition_duration,
+            turbulence_end_time,
+            flight_duration,
             False,
-            turbulence_level=turbulence_level,
         )
-        no_turb_data.update(after_turbulence_df)
-        no_turb_dfs.append(after_turbulence_df)
-    # Fusion des turbulences et non-turbulences
-    df = merge_turbulence_and_noturbulence(
-        turb_data,
-        no_turb_data,
-        turbulence_start_times,
-        turbulence_durations,
-        transition_duration,
-        sampling_frequency,
-    )
-    return df
+    return segments
+
+
+def time_index(start_time, nb_samples, sampling_frequency):
+    """
+    Returns the times, in seconds, of nb_samples samples at sampling_frequency from start_time,
+    used as the index of the turbulence dataframes.
+    """
+    return np.around(
+        np.linspace(
+            start_time,
+            start_time + nb_samples / sampling_frequency - 1 / sampling_frequency,
+            nb_samples,
+        ),
+        6,
+    )  # Rounding to the microsecond to avoid index problems related to rounding
 
 
 def create_calm_conditions_complete_flight(
@@ -291,13 +1196,20 @@ def create_calm_conditions_complete_flight(
     sampling_frequency=100,
     turbulence_level=0,
     transition_duration=3,
+    spectrum_cache=None,
+    rng=None,
+    synthesis="segments",
+    synthesis_block_duration=120,
+    dtype=np.float64,
 ):
     """
     Creates a dataframe containing calm conditions.
     The dataframe contains the columns timestamp, u, v, w, p, q and r.
     The u, v and w columns are the turbulence wind components.
     The columns p, q and r are the rotation rates induced by turbulence.
-    Calm conditions are generated using the generate_3d_turbulence function.
+    The parameter actualisation intervals are synthesized by batches (see
+    generate_turbulence_batch), or continuously by the “overlap_add” synthesis (see
+    generate_nonstationary_turbulence).
     The function attributes are as follows:
     - safire_data: dataframe containing flight instructions
     - plane_parameters: dictionary of aircraft parameters to be taken into account for turbulence
@@ -306,90 +1218,113 @@ def create_calm_conditions_complete_flight(
     from aircraft speed and altitude
     - sampling_frequency: turbulence sampling frequency
     - turbulence_level: turbulence level during the complete flight. Possible turbulence levels are 0 (calm conditions), 1 (light), 2 (moderate) and 3 (severe).
-
+    - spectrum_cache: optional spectrum_cache.SpectrumCache. The speed and altitude of each
+    interval are then quantized to the cache resolution.
+    - rng: numpy random generator (np.random.Generator) or seed
+    - synthesis: “segments” to generate each parameter actualisation period with the mean speed
+    and altitude over the period, or “overlap_add” to make the spectrum follow the speed and
+    altitude of the flight plan continuously (see generate_nonstationary_turbulence). The
+    parameter_actualisation_period is not used by the “overlap_add” synthesis.
+    - synthesis_block_duration: duration of the blocks of the “overlap_add” synthesis, in seconds
+    - dtype: float type of the conditions (np.float32 or np.float64)
     """
-    flight_duration = (
-        int(safire_data["timestamp"].max()) + 1
-    )  # Ajout d'une seconde pour ne pas avoir de problème d'arrondi en fin de simulation
-    wind_data = pd.DataFrame(
-        index=np.around(
-            np.linspace(
+    rng = np.random.default_rng(rng)
+    flight_duration = get_flight_duration(safire_data)
+    flight_profile = _get_flight_profile(safire_data, synthesis)
+    if flight_profile is not None:
+        wind_data = pd.DataFrame(
+            index=time_index(
+                0, flight_duration * sampling_frequency, sampling_frequency
+            ),
+            columns=["u", "v", "w", "p", "q", "r"],
+            data=generate_nonstationary_turbulence(
+                *flight_profile,
+                plane_parameters,
                 0,
-                flight_duration - 1 / sampling_frequency,
                 flight_duration * sampling_frequency,
+                sampling_frequency,
+                0,  # Same level as the “segments” synthesis (is_turbulence=False)
+                block_duration=synthesis_block_duration,
+                spectrum_cache=spectrum_cache,
+                rng=rng,
+                dtype=dtype,
             ),
-            6,
-        ),  # Arrondi à la microseconde pour éviter les problèmes d'index liés aux arrondis
-        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
-        data=0.0,
-    )
+        )
+        wind_data["turbulence"] = np.dtype(dtype).type(0)
+        return wind_data
+    nb_samples = flight_duration * sampling_frequency
+    # Columns u, v, w, p, q, r and turbulence, the faded intervals are added by sample offset
+    wind_data = np.zeros((nb_samples, 7), dtype=dtype)
     v_series = safire_data["platform_speed_wrt_air : from pitot (m/s)"]
     h_series = safire_data["altitude : from GPS (meter)"]
     nb_intervals = int(
         (flight_duration - transition_duration) / parameter_actualisation_period
     )
-    for i in range(nb_intervals):
-        wind_data_i = create_turbulence_df(
-            v_series.iloc[
-                i
-                * parameter_actualisation_period : (i + 1)
-                * parameter_actualisation_period
-            ].mean(),
-            h_series.iloc[
-                i
-                * parameter_actualisation_period : (i + 1)
-                * parameter_actualisation_period
-            ].mean(),
+    ramp = get_ramp(transition_duration * sampling_frequency + 1)
+    intervals = list()  # (start, end of the mean speed and altitude, duration)
+    for i in range(nb_intervals + 1):
+        interval_start = i * parameter_actualisation_period
+        if i < nb_intervals:
+            # The interval overlaps the next one during the transition
+            intervals.append(
+                (
+                    interval_start,
+                    interval_start + parameter_actualisation_period,
+                    parameter_actualisation_period + transition_duration,
+                )
+            )
+        else:
+            intervals.append((interval_start, None, flight_duration - interval_start))
+    # The intervals have the same duration, except the last one: they are synthesized by batches
+    for batch_start in range(0, len(intervals), SYNTHESIS_BATCH_SIZE):
+        batch = intervals[batch_start : batch_start + SYNTHESIS_BATCH_SIZE]
+        batch_wind_data = generate_turbulence_batch(
+            [
+                (
+                    v_series.iloc[interval_start:interval_end].mean(),
+                    h_series.iloc[interval_start:interval_end].mean(),
+                    interval_duration * sampling_frequency,
+                    0,  # Same level as create_turbulence_df with is_turbulence=False
+                    rng,
+                )
+                for interval_start, interval_end, interval_duration in batch
+            ],
             plane_parameters,
-            i * parameter_actualisation_period,
-            parameter_actualisation_period + transition_duration,
             sampling_frequency,
-            False,
-            turbulence_level=turbulence_level,
-        )
-        wind_data_i[
-            i * parameter_actualisation_period : i * parameter_actualisation_period
-            + transition_duration
-        ] *= np.repeat(
-            np.linspace(0, 1, transition_duration * sampling_frequency + 1),
-            wind_data_i.shape[1],
-        ).reshape(
-            -1, wind_data_i.shape[1]
-        )
-        wind_data_i[
-            (i + 1) * parameter_actualisation_period
-            - transition_duration : (i + 1) * parameter_actualisation_period
-        ] *= np.repeat(
-            np.linspace(1, 0, transition_duration * sampling_frequency + 1),
-            wind_data_i.shape[1],
-        ).reshape(
-            -1, wind_data_i.shape[1]
+            spectrum_cache=spectrum_cache,
+            dtype=dtype,
         )
-        wind_data = wind_data.add(wind_data_i, fill_value=0)
-    last_interval = flight_duration - nb_intervals * parameter_actualisation_period
-    wind_data_i = create_turbulence_df(
-        v_series.iloc[nb_intervals * parameter_actualisation_period :].mean(),
-        h_series.iloc[nb_intervals * parameter_actualisation_period :].mean(),
-        plane_parameters,
-        nb_intervals * parameter_actualisation_period,
-        last_interval,
-        sampling_frequency,
-        False,
-        turbulence_level=turbulence_level,
-    )
-    wind_data_i[
-        nb_intervals
-        * parameter_actualisation_period : nb_intervals
-        * parameter_actualisation_period
-        + transition_duration
-    ] *= np.repeat(
-        np.linspace(0, 1, transition_duration * sampling_frequency + 1),
-        wind_data_i.shape[1],
-    ).reshape(
-        -1, wind_data_i.shape[1]
+        for (interval_start, interval_end, _), wind_data_i in zip(
+            batch, batch_wind_data
+        ):
+            # Fade in over the first transition_duration seconds, and fade out over the last
+            # transition_duration seconds of the parameter actualisation period (both included)
+            weights = np.ones(wind_data_i.shape[0])
+            write_ramps(
+                weights,
+                [0],
+                (
+                    []
+                    if interval_end is None
+                    else [parameter_actualisation_period * sampling_frequency + 1]
+                ),
+                ramp,
+                multiply=True,
+                fade_out_ramp=np.linspace(1, 0, len(ramp)),
+            )
+            with profiling.stage("merge"):
+                add_segment(
+                    wind_data[:, :6],
+                    wind_data_i,
+                    interval_start * sampling_frequency,
+                    weights,
+                )
+    return pd.DataFrame(
+        index=time_index(0, nb_samples, sampling_frequency),
+        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+        data=wind_data,
+        copy=False,
     )
-    wind_data = wind_data.add(wind_data_i, fill_value=0)
-    return wind_data
 
 
 def create_turbulence_df(
@@ -401,8 +1336,44 @@ def create_turbulence_df(
     sampling_frequency,
     is_turbulence,
     turbulence_level=2,
+    spectrum_cache=None,
+    rng=None,
+    dtype=np.float64,
 ):
     turbulence_level = turbulence_level if is_turbulence else 0
+    N = turbulence_duration * sampling_frequency
+    magnitudes = get_turbulence_magnitudes(
+        v,
+        h,
+        plane_parameters,
+        N,
+        sampling_frequency,
+        turbulence_level,
+        spectrum_cache=spectrum_cache,
+    )
+    turbulence_data = synthesize_from_magnitudes(magnitudes, N, rng=rng, dtype=dtype).T
+    turbulence_df = pd.DataFrame(
+        index=time_index(turbulence_start_time, N, sampling_frequency),
+        columns=["u", "v", "w", "p", "q", "r"],
+        data=turbulence_data,
+    )
+    turbulence_df["turbulence"] = 1 if is_turbulence else 0
+    return turbulence_df
+
+
+def get_turbulence_parameters(
+    v, h, plane_parameters, sampling_frequency, turbulence_level
+):
+    """
+    Returns the dictionary of turbulence parameters used by the spectra functions.
+    Parameters :
+    - v: aircraft speed, m.s-1
+    - h: altitude, m
+    - plane_parameters: dictionary of aircraft parameters (“b”: aircraft wingspan)
+    - sampling_frequency: turbulence sampling frequency
+    - turbulence_level: turbulence level. Possible turbulence levels are 0 (calm conditions),
+    1 (light), 2 (moderate) and 3 (severe).
+    """
     sigma_u, sigma_v, sigma_w = turbulence_std(h, turbulence_level)
     Lu, Lv, Lw = turbulence_scale_length(h)
     bandwidth = min(turbulence_bandwidth(h, v), sampling_frequency / 2)
@@ -417,45 +1388,185 @@ def create_turbulence_df(
         "bandwidth": bandwidth,
     }
     turbulence_parameters.update(plane_parameters)
-    turbulence_data = generate_3d_turbulence(
-        turbulence_duration * sampling_frequency,
-        sampling_frequency,
-        turbulence_parameters,
-    )
-    turbulence_df = pd.DataFrame(
-        index=np.around(
-            np.linspace(
-                turbulence_start_time,
-                turbulence_start_time + turbulence_duration - 1 / sampling_frequency,
-                turbulence_data.shape[0],
-            ),
-            6,
-        ),  # Arrondi à la microseconde pour éviter les problèmes d'index liés aux arrondis
-        columns=["u", "v", "w", "p", "q", "r"],
-        data=turbulence_data,
+    return turbulence_parameters
+
+
+def get_turbulence_magnitudes(
+    v,
+    h,
+    plane_parameters,
+    N,
+    sampling_frequency,
+    turbulence_level,
+    spectrum_cache=None,
+):
+    """
+    Returns the (6, N // 2 + 1) spectrum amplitudes of the u, v, w, p, q and r channels for the
+    given flight conditions.
+    If a spectrum_cache (see spectrum_cache.SpectrumCache) is given, the speed and the altitude
+    are quantized to the cache resolution and the amplitudes are looked up in the cache.
+    """
+    if spectrum_cache is None:
+        turbulence_parameters = get_turbulence_parameters(
+            v, h, plane_parameters, sampling_frequency, turbulence_level
+        )
+        return compute_spectra_magnitudes(
+            N,
+            sampling_frequency,
+            turbulence_parameters["bandwidth"],
+            SPECTRA_FUNCTIONS,
+            turbulence_parameters,
+        )
+    v, h = spectrum_cache.quantize(v, h)
+    key = (N, sampling_frequency, v, h, turbulence_level, plane_parameters["b"])
+    return spectrum_cache.get(
+        key,
+        lambda: get_turbulence_magnitudes(
+            v, h, plane_parameters, N, sampling_frequency, turbulence_level
+        ),
     )
-    turbulence_df["turbulence"] = 1 if is_turbulence else 0
-    return turbulence_df
 
 
-def generate_turbulence_times(flight_duration, turbulence_mean_length, turbulence_part):
+def get_turbulence_parameters_array(
+    v, h, plane_parameters, sampling_frequency, turbulence_level
+):
+    """
+    Array version of get_turbulence_parameters: v, h (and optionally turbulence_level) are arrays
+    of the same shape, and each turbulence parameter is an array of this shape.
+    """
+    sigma_u, sigma_v, sigma_w = turbulence_std_array(h, turbulence_level)
+    Lu, Lv, Lw = turbulence_scale_length_array(h)
+    bandwidth = np.minimum(turbulence_bandwidth_array(h, v), sampling_frequency / 2)
+    turbulence_parameters = {
+        "V": np.asarray(v, dtype=float),
+        "sigma_u": sigma_u,
+        "sigma_v": sigma_v,
+        "sigma_w": sigma_w,
+        "Lu": Lu,
+        "Lv": Lv,
+        "Lw": Lw,
+        "bandwidth": bandwidth,
+    }
+    turbulence_parameters.update(plane_parameters)
+    return turbulence_parameters
+
+
+def generate_nonstationary_turbulence(
+    times,
+    v_profile,
+    h_profile,
+    plane_parameters,
+    first_sample,
+    nb_samples,
+    sampling_frequency,
+    turbulence_level,
+    block_duration=120,
+    spectrum_cache=None,
+    rng=None,
+    dtype=np.float64,
+):
+    """
+    Generates turbulence whose spectrum follows the aircraft speed and altitude profiles, by
+    overlap-add of short windowed blocks.
+    Each block of block_duration seconds is synthesized with the turbulence parameters of the
+    speed and altitude at its center. The blocks overlap by half their duration and are weighted
+    by a sine window, whose square sums to 1 over overlapping blocks (constant power): the
+    variance follows the profiles continuously, without any discontinuity between blocks.
+    The cost is O(N log B) for N samples and blocks of B samples, whatever the profile variations.
+    Frequencies below 1 / block_duration are not represented, so block_duration should stay long
+    compared to the turbulence scale lengths divided by the aircraft speed.
+    Parameters :
+    - times: times of the speed and altitude profiles, s
+    - v_profile: aircraft speed at times, m.s-1
+    - h_profile: altitude at times, m
+    - plane_parameters: dictionary of aircraft parameters (“b”: aircraft wingspan)
+    - first_sample: index of the first sample to generate in the flight
+    - nb_samples: number of samples to generate
+    - sampling_frequency: turbulence sampling frequency
+    - turbulence_level: turbulence level. Possible turbulence levels are 0 (calm conditions),
+    1 (light), 2 (moderate) and 3 (severe).
+    - block_duration: duration of the synthesized blocks, s
+    - spectrum_cache: optional spectrum_cache.SpectrumCache. The speed and altitude of each
+    block are then quantized to the cache resolution.
+    - rng: numpy random generator (np.random.Generator) or seed
+    - dtype: float type of the turbulence (np.float32 or np.float64)
+    Returns an array of shape (nb_samples, 6).
+    """
+    rng = np.random.default_rng(rng)
+    hop = max(int(block_duration * sampling_frequency / 2), 1)
+    block_size = 2 * hop
+    window = np.sin(np.pi * (np.arange(block_size) + 0.5) / block_size)
+    # Block k covers the samples [first_sample + (k - 1) * hop, first_sample + (k + 1) * hop)
+    nb_blocks = (nb_samples - 1) // hop + 2
+    block_times = (first_sample + hop * np.arange(nb_blocks)) / sampling_frequency
+    v_blocks = np.interp(block_times, times, v_profile)
+    h_blocks = np.interp(block_times, times, h_profile)
+    data = np.zeros((6, (nb_blocks + 1) * hop), dtype=dtype)
+    for batch_start in range(0, nb_blocks, OVERLAP_ADD_BATCH_SIZE):
+        batch = slice(batch_start, min(batch_start + OVERLAP_ADD_BATCH_SIZE, nb_blocks))
+        if spectrum_cache is None:
+            turbulence_parameters = get_turbulence_parameters_array(
+                v_blocks[batch, np.newaxis],
+                h_blocks[batch, np.newaxis],
+                plane_parameters,
+                sampling_frequency,
+                turbulence_level,
+            )
+            magnitudes = compute_spectra_magnitudes(
+                block_size,
+                sampling_frequency,
+                turbulence_parameters["bandwidth"][:, 0],
+                SPECTRA_FUNCTIONS,
+                turbulence_parameters,
+            )
+        else:
+            magnitudes = np.stack(
+                [
+                    get_turbulence_magnitudes(
+                        v,
+                        h,
+                        plane_parameters,
+                        block_size,
+                        sampling_frequency,
+                        turbulence_level,
+                        spectrum_cache=spectrum_cache,
+                    )
+                    for v, h in zip(v_blocks[batch], h_blocks[batch])
+                ]
+            )
+        blocks = synthesize_from_magnitudes(
+            magnitudes, block_size, rng=rng, dtype=dtype
+        )
+        blocks *= window
+        for k, block in enumerate(blocks, batch.start):
+            data[:, k * hop : k * hop + block_size] += block
+    return data[:, hop : hop + nb_samples].T
+
+
+def generate_turbulence_times(
+    flight_duration, turbulence_mean_length, turbulence_part, rng=None
+):
     """
     Generates turbulence start times and durations.
     Turbulence is generated randomly, with an average duration of turbulence_mean_length
     and a proportion of cumulative time in turbulence close to turbulence_part on average.
     The last turbulence can be truncated to respect the proportion of cumulative time in turbulence.
+    rng is a numpy random generator (np.random.Generator) or a seed.
     """
+    rng = np.random.default_rng(rng)
     turbulence_durations = list()
     turbulence_start_times = list()
     total_turbulence_time = 0
     # Choix des durées de turbulences
-    nb_turb = random.randint(
+    nb_turb = rng.integers(
         max(int(flight_duration * turbulence_part / turbulence_mean_length) - 1, 1),
         int(flight_duration * turbulence_part / turbulence_mean_length) + 1,
+        endpoint=True,
     )
     for i in range(nb_turb):
         new_turb_duration = int(
-            turbulence_mean_length + 0.2 * turbulence_mean_length * np.random.randn()
+            turbulence_mean_length
+            + 0.2 * turbulence_mean_length * rng.standard_normal()
         )
         if new_turb_duration <= 0:
             continue
@@ -467,8 +1578,8 @@ def generate_turbulence_times(flight_duration, turbulence_mean_length, turbulenc
     ## de faire est la suivante : on part des instants sans turbulences et on choisi aléatoirement
     ## des instants où intercaler des turbulences.
     no_turb_duration = flight_duration - total_turbulence_time
-    turb_insertion_indexes = np.array(
-        random.sample(range(no_turb_duration), len(turbulence_durations))
+    turb_insertion_indexes = rng.choice(
+        no_turb_duration, size=len(turbulence_durations), replace=False
     )
     turb_insertion_indexes = np.sort(turb_insertion_indexes)
     turb_cumsum = np.cumsum(turbulence_durations)
@@ -478,23 +1589,27 @@ def generate_turbulence_times(flight_duration, turbulence_mean_length, turbulenc
     return turbulence_start_times, turbulence_durations
 
 
-def generate_3d_turbulence(N, sampling_frequency, turbulence_parameters):
+def generate_3d_turbulence(
+    N, sampling_frequency, turbulence_parameters, rng=None, dtype=np.float64
+):
     """
     Generates turbulence of length N.
-    The turbulence is generated by the generate_perfect_spectra_noise function.
+    The six channels (u, v, w, p, q, r) are generated together by the batched spectral
+    synthesis engine (see compute_spectra_magnitudes and synthesize_from_magnitudes).
     The turbulence parameters (sigma_u, sigma_v, sigma_w, Lu, Lv, Lw and V) and the bandwidth are defined in the turbulence_parameters dictionary.
     Aircraft speed is defined by the V parameter.
+    rng is a numpy random generator (np.random.Generator) or a seed.
+    dtype is the float type of the turbulence (np.float32 or np.float64).
+    Returns an array of shape (N, 6).
     """
-    turbulence = np.zeros((N, 6))
-    for i, func in enumerate([f_u, f_v, f_w, f_p, f_q, f_r]):
-        turbulence[:, i] = generate_perfect_spectra_noise(
-            N,
-            sampling_frequency,
-            turbulence_parameters["bandwidth"],
-            func,
-            turbulence_parameters,
-        )
-    return turbulence
+    magnitudes = compute_spectra_magnitudes(
+        N,
+        sampling_frequency,
+        turbulence_parameters["bandwidth"],
+        SPECTRA_FUNCTIONS,
+        turbulence_parameters,
+    )
+    return synthesize_from_magnitudes(magnitudes, N, rng=rng, dtype=dtype).T
 
 
 def merge_turbulence_and_noturbulence(
@@ -505,6 +1620,7 @@ def merge_turbulence_and_noturbulence(
     transition_duration,
     sampling_frequency,
     transition_function="linear",
+    dtype=None,
 ):
     """
     Merges turbulence and non-turbulence by applying a transition function to each transition from turbulence to non-turbulence and vice versa.
@@ -515,55 +1631,97 @@ def merge_turbulence_and_noturbulence(
         - turbulence_durations: list of turbulence durations
         - transition_duration: duration of the transition between turbulence and non-turbulence, in seconds.
         - sampling_frequency: turbulence sampling frequency
-        - transition_function: transition function between turbulence and non-turbulence. The functions are “linear” (f(x)=x/transition_duration) and “cosine” (f(x)=0.5*(1-cos(pi*x/transition_duration)))
+        - transition_function: transition function between turbulence and non-turbulence. The functions are “linear” (f(x)=x/transition_duration), “cosine” (f(x)=0.5*(1-cos(pi*x/transition_duration))) and “constant_power” (f(x)=sin(pi/2*x/transition_duration), the non-turbulence being weighted by sqrt(1-f(x)²))
+        - dtype: float type of the merged dataframe, the float type of the turbulence columns of
+        turb_data by default (float64 for integer columns)
+    """
+    columns = ["u", "v", "w", "p", "q", "r"]
+    if dtype is None:
+        dtype = np.result_type(*turb_data[columns].dtypes, np.float32)
+    coefs = get_transition_coefficients(
+        turb_data["turbulence"].values,
+        turbulence_start_times,
+        turbulence_durations,
+        transition_duration,
+        sampling_frequency,
+        transition_function=transition_function,
+    )
+    data = np.empty((turb_data.shape[0], 7), dtype=dtype)
+    data[:, 6] = turb_data["turbulence"].to_numpy()
+    blend(
+        turb_data[columns].to_numpy(),
+        no_turb_data[columns].to_numpy(),
+        coefs,
+        transition_function,
+        out=data[:, :6],
+    )
+    return pd.DataFrame(
+        index=time_index(0, turb_data.shape[0], sampling_frequency),
+        columns=["u", "v", "w", "p", "q", "r", "turbulence"],
+        data=data,
+        copy=False,
+    )
+
+
+def get_transition_coefficients(
+    turbulence_flags,
+    turbulence_start_times,
+    turbulence_durations,
+    transition_duration,
+    sampling_frequency,
+    transition_function="linear",
+    first_sample=0,
+    flight_duration=None,
+):
+    """
+    Returns the coefficient applied to the turbulence at each sample when merging turbulence and
+    non-turbulence (1 - coefficient is applied to the non-turbulence).
+    The coefficient is the turbulence flag, with a transition at the beginning and at the end of
+    each turbulence (except at the beginning and at the end of the flight).
+    Parameters :
+        - turbulence_flags: array indicating whether turbulence is occurring at each sample
+        - turbulence_start_times: list of turbulence start times
+        - turbulence_durations: list of turbulence durations
+        - transition_duration: duration of the transition between turbulence and non-turbulence, in seconds.
+        - sampling_frequency: turbulence sampling frequency
+        - transition_function: “linear”, “cosine” or “constant_power” (see crossfade)
+        - first_sample: index in the flight of the first sample of turbulence_flags, to compute
+        the coefficients of a part of the flight only
+        - flight_duration: duration of the flight, in seconds. By default, turbulence_flags is
+        considered to end with the flight.
     """
-    turb_data = turb_data.copy()
-    no_turb_data = no_turb_data.copy()
-    coefs = (
-        turb_data["turbulence"].copy().values
+    coefs = np.array(
+        turbulence_flags, dtype=float
     )  # Coefficient de choix entre turbulences et non-turbulences
+    if flight_duration is None:
+        flight_duration = (first_sample + coefs.shape[0]) / sampling_frequency
     turb_starts = [
-        int(t * sampling_frequency) for t in turbulence_start_times if t != 0
+        int(t * sampling_frequency) - first_sample
+        for t in turbulence_start_times
+        if t != 0
     ]
     turb_ends = [
-        int((t + d) * sampling_frequency)
+        int((t + d) * sampling_frequency) - first_sample
         for t, d in zip(turbulence_start_times, turbulence_durations)
-        if t + d != turb_data.shape[0] / sampling_frequency
+        if t + d != flight_duration
     ]
-    if transition_function == "linear":
-        transition = np.linspace(0, 1, int(transition_duration * sampling_frequency))
-    elif transition_function == "cosine":
-        transition = 0.5 * (
-            1
-            - np.cos(
-                np.linspace(0, np.pi, int(transition_duration * sampling_frequency))
-            )
-        )
-    for turb_start in turb_starts:
-        coefs[turb_start : turb_start + len(transition)] = transition
-    for turb_end in turb_ends:
-        coefs[turb_end - len(transition) : turb_end] = transition[::-1]
-    data = turb_data[["u", "v", "w", "p", "q", "r"]].values * coefs.reshape(
-        -1, 1
-    ) + no_turb_data[["u", "v", "w", "p", "q", "r"]].values * (1 - coefs.reshape(-1, 1))
-    df = pd.DataFrame(
-        index=np.around(
-            np.linspace(
-                0,
-                turb_data.shape[0] / sampling_frequency - 1 / sampling_frequency,
-                turb_data.shape[0],
-            ),
-            6,
-        ),
-        columns=["u", "v", "w", "p", "q", "r"],
-        data=data,
+    write_ramps(
+        coefs,
+        turb_starts,
+        turb_ends,
+        get_ramp(int(transition_duration * sampling_frequency), transition_function),
     )
-    df["turbulence"] = turb_data["turbulence"]
-    return df
+    return coefs
 
 
 def generate_perfect_spectra_noise(
-    N, sampling_frequency, bandwidth, filtering_function, filtering_func_params
+    N,
+    sampling_frequency,
+    bandwidth,
+    filtering_function,
+    filtering_func_params,
+    rng=None,
+    dtype=np.float64,
 ):
     """
     Generates N noise samples whose spectrum perfectly conforms to the filtering_function filter.
@@ -579,22 +1737,211 @@ def generate_perfect_spectra_noise(
     - bandwidth
     - filtering_function: filtering function (Hu, Hv or Hw) in the Fourier domain
     - filtering_func_params: dictionary containing filtering_function parameters
+    - rng: numpy random generator (np.random.Generator) or seed
+    - dtype: float type of the samples (np.float32 or np.float64)
     """
-    abs_spectrum = np.zeros(N)
-    frequencies = np.fft.fftfreq(N, 1 / sampling_frequency)
-    abs_spectrum[1 : int(N / 2)] = filtering_function(
-        2 * np.pi * frequencies[1 : int(N / 2)], filtering_func_params
+    magnitudes = compute_spectra_magnitudes(
+        N,
+        sampling_frequency,
+        bandwidth,
+        [filtering_function],
+        filtering_func_params,
     )
-    abs_spectrum[int(N / 2) + 1 :] = abs_spectrum[int(N / 2) - 1 : 0 : -1]
-    phase_spectrum = np.zeros(N)
-    assert bandwidth <= sampling_frequency / 2
-    abs_spectrum[
-        int(bandwidth * N / sampling_frequency) : -int(
-            bandwidth * N / sampling_frequency
+    return synthesize_from_magnitudes(magnitudes, N, rng=rng, dtype=dtype)[0]
+
+
+def compute_spectra_magnitudes(
+    N, sampling_frequency, bandwidth, filtering_functions, filtering_func_params
+):
+    """
+    Computes the one-sided spectrum amplitudes used to generate N noise samples for several
+    channels at once.
+    Only the non-negative frequencies are stored (real signals have a Hermitian spectrum), so
+    the result can be given directly to np.fft.irfft. The DC and Nyquist bins are set to 0,
+    as well as the bins above the bandwidth.
+    The spectra of several flight conditions can be computed together: bandwidth is then an array
+    of shape (M,) and the parameters of filtering_func_params are arrays of shape (M, 1).
+    Parameters :
+    - N: number of samples
+    - sampling_frequency: sampling frequency
+    - bandwidth: maximal frequency of the spectrum, in Hz
+    - filtering_functions: list of filtering functions (f_u, f_v, ...) in the Fourier domain.
+    SPECTRA_FUNCTIONS is computed by the fused kernel turbulence_spectra.spectra_magnitudes.
+    - filtering_func_params: dictionary containing filtering_functions parameters
+    Returns an array of shape (len(filtering_functions), N // 2 + 1), or
+    (M, len(filtering_functions), N // 2 + 1) for an array of bandwidths.
+    """
+    with profiling.stage("spectra"):
+        bandwidth = np.asarray(bandwidth)
+        assert np.all(bandwidth <= sampling_frequency / 2)
+        nb_positive_frequencies = (N - 1) // 2  # Excluding the DC and Nyquist bins
+        omegas = 2 * np.pi * np.fft.rfftfreq(N, 1 / sampling_frequency)
+        magnitudes = np.zeros(bandwidth.shape + (len(filtering_functions), N // 2 + 1))
+        if tuple(filtering_functions) == SPECTRA_FUNCTIONS:
+            # The six channels are computed by the fused kernel
+            spectra_magnitudes(
+                omegas[1 : nb_positive_frequencies + 1],
+                filtering_func_params,
+                out=magnitudes[..., 1 : nb_positive_frequencies + 1],
+            )
+        else:
+            for i, filtering_function in enumerate(filtering_functions):
+                magnitudes[..., i, 1 : nb_positive_frequencies + 1] = (
+                    filtering_function(
+                        omegas[1 : nb_positive_frequencies + 1], filtering_func_params
+                    )
+                )
+        cutoff_indexes = (bandwidth * N / sampling_frequency).astype(int)
+        for index in np.ndindex(bandwidth.shape):
+            cutoff_index = cutoff_indexes[index]
+            if cutoff_index > 0:
+                # The two-sided generator used to keep the negative frequency bin at the
+                # cutoff, which amounts to half of its amplitude once the real part is taken.
+                magnitudes[index + (slice(None), cutoff_index)] *= 0.5
+                magnitudes[index + (slice(None), slice(cutoff_index + 1, None))] = 0
+        return magnitudes
+
+
+def synthesize_from_magnitudes(magnitudes, N, rng=None, dtype=np.float64):
+    """
+    Generates noise samples from one-sided spectrum amplitudes (see compute_spectra_magnitudes).
+    The phases of all the channels are drawn in a single call, uniformly between 0 and 2pi,
+    and a single inverse real Fourier transform is computed along the last axis.
+    Parameters :
+    - magnitudes: array of shape (..., N // 2 + 1) of spectrum amplitudes
+    - N: number of samples
+    - rng: numpy random generator (np.random.Generator) or seed
+    - dtype: float type of the samples. With np.float32, the spectrum is complex64 and the
+    inverse Fourier transform is computed in single precision. The phases are drawn in double
+    precision whatever the dtype, so the random stream does not depend on it.
+    Returns an array of shape (..., N).
+    """
+    with profiling.stage("synthesis"):
+        spectrum = _random_phase_spectrum(
+            magnitudes, N, np.random.default_rng(rng), dtype=dtype
         )
-    ] = 0
-    phase_spectrum[1 : int(N / 2)] = np.random.uniform(0, 2 * np.pi, int(N / 2) - 1)
-    phase_spectrum[int(N / 2) + 1 :] = -phase_spectrum[int(N / 2) - 1 : 0 : -1]
-    spectrum = abs_spectrum * np.exp(1j * phase_spectrum)
-    signal = np.sqrt(N) * np.fft.ifft(spectrum).real
-    return signal
+        signal = np.fft.irfft(spectrum, n=N, axis=-1)
+        signal *= np.sqrt(N)
+        return signal
+
+
+def synthesize_batch(
+    magnitudes, sizes, rngs, max_batch_size=SYNTHESIS_BATCH_SIZE, dtype=np.float64
+):
+    """
+    Generates the noise samples of several spectra, as synthesize_from_magnitudes(magnitudes[i],
+    sizes[i], rngs[i]) for each i, with identical results. The spectra of the same size and shape
+    are synthesized together, by a single inverse real Fourier transform of up to max_batch_size
+    spectra, which amortizes the Fourier transform planning and the Python overhead over the
+    segments of the same duration (the intervals of a calm conditions flight, or the segments of
+    several flights).
+    The phases are drawn in the order of the spectra, so that several spectra can share the same
+    random generator.
+    Parameters :
+    - magnitudes: list of arrays of shape (..., N // 2 + 1) of spectrum amplitudes
+    - sizes: list of the numbers of samples N
+    - rngs: list of numpy random generators (np.random.Generator) or seeds
+    - max_batch_size: maximal number of spectra synthesized by a single Fourier transform
+    - dtype: float type of the samples (see synthesize_from_magnitudes)
+    Returns the list of the arrays of shape (..., N).
+    """
+    signals = [None] * len(sizes)
+    batches = dict()  # (N, shape): (indexes, spectrum buffer)
+
+    def synthesize(key):
+        indexes, spectra = batches.pop(key)
+        with profiling.stage("synthesis"):
+            batch_signal = np.fft.irfft(spectra[: len(indexes)], n=key[0], axis=-1)
+            batch_signal *= np.sqrt(key[0])
+        for i, index in enumerate(indexes):
+            signals[index] = batch_signal[i]
+
+    for index, (spectrum_magnitudes, N, rng) in enumerate(zip(magnitudes, sizes, rngs)):
+        key = (N, spectrum_magnitudes.shape)
+        if key not in batches:
+            batches[key] = (
+                list(),
+                np.empty(
+                    (max_batch_size,) + spectrum_magnitudes.shape,
+                    dtype=np.result_type(dtype, np.complex64),
+                ),
+            )
+        indexes, spectra = batches[key]
+        with profiling.stage("synthesis"):
+            _random_phase_spectrum(
+                spectrum_magnitudes,
+                N,
+                np.random.default_rng(rng),
+                out=spectra[len(indexes)],
+            )
+        indexes.append(index)
+        if len(indexes) == max_batch_size:
+            synthesize(key)
+    for key in list(batches):
+        synthesize(key)
+    return signals
+
+
+def generate_turbulence_batch(
+    requests,
+    plane_parameters,
+    sampling_frequency,
+    spectrum_cache=None,
+    max_batch_size=SYNTHESIS_BATCH_SIZE,
+    dtype=np.float64,
+):
+    """
+    Generates the turbulence of several segments, grouping the segments of the same number of
+    samples in batched Fourier transforms (see synthesize_batch). The result of each segment is
+    identical to the data of create_turbulence_df with the same conditions and rng.
+    Parameters :
+    - requests: list of (v, h, N, turbulence_level, rng) tuples: aircraft speed (m.s-1),
+    altitude (m), number of samples, turbulence level and random generator (or seed) of each
+    segment. The segments can belong to different flights.
+    - plane_parameters: dictionary of aircraft parameters (“b”: aircraft wingspan)
+    - sampling_frequency: turbulence sampling frequency
+    - spectrum_cache: optional spectrum_cache.SpectrumCache
+    - max_batch_size: maximal number of segments synthesized by a single Fourier transform
+    - dtype: float type of the generated turbulence (np.float32 or np.float64)
+    Returns the list of the (N, 6) arrays of the u, v, w, p, q and r columns of each segment.
+    """
+    signals = synthesize_batch(
+        [
+            get_turbulence_magnitudes(
+                v,
+                h,
+                plane_parameters,
+                N,
+                sampling_frequency,
+                turbulence_level,
+                spectrum_cache=spectrum_cache,
+            )
+            for v, h, N, turbulence_level, rng in requests
+        ],
+        [N for v, h, N, turbulence_level, rng in requests],
+        [rng for v, h, N, turbulence_level, rng in requests],
+        max_batch_size,
+        dtype,
+    )
+    return [signal.T for signal in signals]
+
+
+def _random_phase_spectrum(magnitudes, N, rng, out=None, dtype=np.float64):
+    """
+    Returns the one-sided spectrum of amplitudes magnitudes and of phases drawn uniformly between
+    0 and 2pi (0 for the DC and Nyquist bins), written in out if given, or in a complex array of
+    the precision of dtype.
+    """
+    if out is None:
+        out = np.empty(magnitudes.shape, dtype=np.result_type(dtype, np.complex64))
+    nb_positive_frequencies = (N - 1) // 2
+    phases = np.zeros(magnitudes.shape)
+    phases[..., 1 : nb_positive_frequencies + 1] = rng.uniform(
+        0, 2 * np.pi, magnitudes.shape[:-1] + (nb_positive_frequencies,)
+    )
+    # The spectrum is built in place to limit the number of temporaries
+    spectrum = np.multiply(1j, phases, out=out)
+    del phases
+    np.exp(spectrum, out=spectrum)
+    spectrum *= magnitudes
+    return spectrum
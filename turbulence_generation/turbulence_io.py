@@ -0,0 +1,242 @@
+import os
+import struct
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+"""
+Output formats of the generated files:
+- “csv”: text file with a header line, as read by lireFichierCSV.m
+- “npy”: NumPy file holding a structured array with one little-endian float field per column.
+The records are contiguous and can be memory-mapped by np.load(..., mmap_mode="r") or read by
+fread in Matlab.
+- “bin”: fixed-layout binary file, read by lireFichierBinaire.m. The little-endian header is:
+    - bytes 0-7: magic string “FSIMBIN1”
+    - bytes 8-11: uint32, header size in bytes (offset of the data, multiple of 64)
+    - bytes 12-15: uint32, size of a value in bytes (4 for float32, 8 for float64)
+    - bytes 16-23: uint64, number of rows
+    - bytes 24-27: uint32, number of columns
+    - bytes 28-31: uint32, number of leading columns stored in float64 whatever the size of the
+    values (1 for a timestamp column, see TIME_COLUMN)
+    - bytes 32-: comma separated column names, padded with zeros up to the header size
+followed by the rows of little-endian floats.
+In the binary formats, a leading timestamp column is always stored in float64: in float32, the
+spacing of the times would reach 4 ms after 10 hours, more than the sampling period.
+"""
+FILE_EXTENSIONS = {"csv": ".csv", "npy": ".npy", "bin": ".bin"}
+BINARY_MAGIC = b"FSIMBIN1"
+BINARY_HEADER_ALIGNMENT = 64
+# Column stored in float64 in the binary formats when it is the first column
+TIME_COLUMN = "timestamp"
+
+
+@contextmanager
+def atomic_output_path(file_path):
+    """
+    Context manager yielding a temporary path next to file_path. The temporary file is renamed
+    to file_path when the block exits without error, and removed otherwise. An interrupted
+    generation therefore never leaves a truncated file at file_path.
+    Parameters :
+    - file_path: pathlib.Path of the final file
+    """
+    tmp_file_path = file_path.with_name(file_path.name + ".tmp")
+    try:
+        yield tmp_file_path
+        os.replace(tmp_file_path, file_path)
+    finally:
+        if tmp_file_path.exists():
+            tmp_file_path.unlink()
+
+
+def write_csv_blocks(blocks, file_path):
+    """
+    Writes an iterable of dataframes with identical columns into a single csv file, one block
+    at a time, so that only one block is held in memory. The file is written atomically.
+    Parameters :
+    - blocks: iterable of dataframes, written without their index
+    - file_path: pathlib.Path of the csv file
+    """
+    with atomic_output_path(file_path) as tmp_file_path:
+        with open(tmp_file_path, "w", newline="") as file:
+            for i, block in enumerate(blocks):
+                block.to_csv(file, header=i == 0, index=False)
+
+
+def write_table(df, file_path, file_format="csv", dtype=np.float64):
+    """
+    Writes a dataframe in the given file format (see FILE_EXTENSIONS). The file is written
+    atomically.
+    Parameters :
+    - df: dataframe, written without its index
+    - file_path: pathlib.Path of the file
+    - file_format: “csv”, “npy” or “bin”
+    - dtype: float type of the values in binary files (np.float32 or np.float64), apart from the
+    timestamp column (see the module description)
+    """
+    if file_format == "csv":
+        with atomic_output_path(file_path) as tmp_file_path:
+            df.to_csv(tmp_file_path, index=False)
+    else:
+        write_table_blocks(
+            [df], file_path, df.shape[0], file_format=file_format, dtype=dtype
+        )
+
+
+def write_table_blocks(blocks, file_path, nb_rows, file_format="csv", dtype=np.float64):
+    """
+    Writes an iterable of dataframes with identical columns into a single file, one block at a
+    time. The file is written atomically.
+    Parameters :
+    - blocks: iterable of dataframes, written without their index
+    - file_path: pathlib.Path of the file
+    - nb_rows: total number of rows of the blocks, needed for the header of binary files
+    - file_format: “csv”, “npy” or “bin”
+    - dtype: float type of the values in binary files (np.float32 or np.float64), apart from the
+    timestamp column (see the module description)
+    """
+    if file_format == "csv":
+        write_csv_blocks(blocks, file_path)
+        return
+    if file_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown file format: {file_format}")
+    dtype = np.dtype(dtype).newbyteorder("<")
+    with atomic_output_path(file_path) as tmp_file_path:
+        with open(tmp_file_path, "wb") as file:
+            row = 0
+            for block in blocks:
+                if row == 0:
+                    records_dtype = get_records_dtype(list(block.columns), dtype)
+                    if file_format == "npy":
+                        _write_npy_header(file, records_dtype, nb_rows)
+                    else:
+                        _write_binary_header(file, records_dtype, dtype, nb_rows)
+                records = np.empty(block.shape[0], dtype=records_dtype)
+                for column in records_dtype.names:
+                    records[column] = block[column].to_numpy()
+                file.write(records.tobytes())
+                row += block.shape[0]
+        if row != nb_rows:
+            raise ValueError(f"{row} rows written, {nb_rows} rows expected")
+
+
+def read_table(file_path, mmap=True):
+    """
+    Reads a file written by write_table or write_table_blocks, selecting the format from the
+    file extension.
+    Binary files are memory-mapped when mmap is True, the returned dataframe then only copies
+    the data when the columns are accessed.
+    """
+    if file_path.suffix == ".csv":
+        return pd.read_csv(file_path)
+    records = read_binary_table(file_path, mmap=mmap)
+    columns = list(records.dtype.names)
+    field_dtypes = {records.dtype[column] for column in columns}
+    if len(field_dtypes) == 1:
+        # The records are then a row-major (nb_rows, nb_columns) array, a single pandas block
+        return pd.DataFrame(
+            records.view(field_dtypes.pop()).reshape(-1, len(columns)),
+            columns=columns,
+            copy=False,
+        )
+    return pd.DataFrame({column: records[column] for column in columns}, copy=False)
+
+
+def read_binary_table(file_path, mmap=True):
+    """
+    Returns the rows of a “npy” or “bin” file as a structured array with one float field per
+    column. The array is a read-only memory map of the file when mmap is True.
+    """
+    if file_path.suffix == ".npy":
+        return np.load(file_path, mmap_mode="r" if mmap else None)
+    with open(file_path, "rb") as file:
+        magic, header_size, itemsize, nb_rows, nb_columns, nb_float64_columns = (
+            struct.unpack("<8sIIQII", file.read(32))
+        )
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{file_path} is not a binary table file")
+        columns = file.read(header_size - 32).rstrip(b"\0").decode("ascii").split(",")
+    records_dtype = np.dtype(
+        [
+            (column, "<f8" if i < nb_float64_columns else f"<f{itemsize}")
+            for i, column in enumerate(columns)
+        ]
+    )
+    if mmap:
+        return np.memmap(
+            file_path,
+            dtype=records_dtype,
+            mode="r",
+            offset=header_size,
+            shape=(nb_rows,),
+        )
+    return np.fromfile(file_path, dtype=records_dtype, offset=header_size)
+
+
+def get_records_dtype(columns, dtype):
+    """
+    Returns the little-endian structured type of the rows of the binary files: one dtype field
+    per column, apart from a leading TIME_COLUMN, stored in float64.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    return np.dtype(
+        [
+            (
+                column,
+                np.dtype("<f8") if i == 0 and column == TIME_COLUMN else dtype,
+            )
+            for i, column in enumerate(columns)
+        ]
+    )
+
+
+def convert_csv_dir(csv_dir_path, output_dir_path, file_format="npy", dtype=np.float32):
+    """
+    Converts all the csv files of a directory (turbulence, calm conditions or icing files) to a
+    binary file format. Files already converted are skipped.
+    Parameters :
+    - csv_dir_path: path to the folder containing the csv files
+    - output_dir_path: path to the folder where the converted files will be saved
+    - file_format: “npy” or “bin”
+    - dtype: float type of the values (np.float32 or np.float64)
+    """
+    for csv_file_path in sorted(csv_dir_path.glob("*.csv")):
+        output_file_path = output_dir_path / (
+            csv_file_path.stem + FILE_EXTENSIONS[file_format]
+        )
+        if not output_file_path.exists():
+            write_table(
+                pd.read_csv(csv_file_path),
+                output_file_path,
+                file_format=file_format,
+                dtype=dtype,
+            )
+
+
+def _write_npy_header(file, records_dtype, nb_rows):
+    np.lib.format.write_array_header_1_0(
+        file,
+        {"descr": records_dtype.descr, "fortran_order": False, "shape": (nb_rows,)},
+    )
+
+
+def _write_binary_header(file, records_dtype, dtype, nb_rows):
+    columns = records_dtype.names
+    # Only a leading time column can have another type than dtype (see get_records_dtype)
+    nb_float64_columns = int(records_dtype[0] != dtype)
+    names = ",".join(columns).encode("ascii")
+    header_size = -(-(32 + len(names)) // BINARY_HEADER_ALIGNMENT) * (
+        BINARY_HEADER_ALIGNMENT
+    )
+    file.write(
+        struct.pack(
+            "<8sIIQII",
+            BINARY_MAGIC,
+            header_size,
+            dtype.itemsize,
+            nb_rows,
+            len(columns),
+            nb_float64_columns,
+        )
+    )
+    file.write(names.ljust(header_size - 32, b"\0"))
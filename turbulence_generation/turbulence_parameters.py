@@ -102,3 +102,111 @@ def turbulence_scale_length(h_m):
 def turbulence_bandwidth(h_m, v):
     Lu, Lv, Lw = turbulence_scale_length(h_m)
     return 100 * v / max(Lu, Lv, Lw)
+
+
+def turbulence_std_array(h_m, turbulence_level):
+    """
+    Array version of turbulence_std, returning the same values for each element (up to the last
+    bit of the vectorized power function). Used to compute the standard deviations along a whole
+    altitude profile in one call.
+    Parameters:
+    - h_m : array of altitudes in meters
+    - turbulence_level : turbulence level (0, 1, 2 or 3), scalar or array broadcastable with h_m,
+    of integers or of integral floats (as read from a csv file)
+    Returns :
+    - sigma_u, sigma_v, sigma_w : arrays of standard deviations of the longitudinal, lateral and
+    vertical turbulence
+    """
+    m2feet = 3.28084
+    turbulence_level = np.asarray(turbulence_level)
+    if not np.isin(turbulence_level, (0, 1, 2, 3)).all():
+        raise ValueError("turbulence_level must be 0, 1, 2 or 3")
+    h_ft, turbulence_level = np.broadcast_arrays(
+        np.asarray(h_m, dtype=float) * m2feet,
+        np.asarray(turbulence_level, dtype=np.intp),
+    )
+    sigma_u = np.empty(h_ft.shape)
+    sigma_w = np.empty(h_ft.shape)
+
+    low = h_ft <= 1000
+    W20_kn = np.array([5, 15, 30, 45])[turbulence_level[low]]
+    sigma_w_ft_sec = 0.1 * W20_kn
+    sigma_u[low] = sigma_w_ft_sec / (0.177 + 0.000823 * h_ft[low]) ** 0.4 / m2feet
+    sigma_w[low] = sigma_w_ft_sec / m2feet
+
+    high = h_ft >= 2000  # stds from figure 262, page 799
+    for level, (altitudes_ft, sigmas_ft_sec) in enumerate(
+        (
+            ([0, 80000], [1, 1]),
+            ([0, 8000, 16000, 80000], [5, 5, 3, 3]),
+            ([0, 10000, 44000, 80000], [10, 10, 3, 3]),
+            ([2000, 4000, 20000, 80000], [15, 20, 20, 3]),
+        )
+    ):
+        level_high = high & (turbulence_level == level)
+        sigma_u[level_high] = (
+            np.interp(h_ft[level_high], altitudes_ft, sigmas_ft_sec) / m2feet
+        )
+    sigma_w[high] = sigma_u[high]
+
+    blend = ~(low | high)
+    if blend.any():
+        # Same bounds as turbulence_std, linear interpolation computed as np.interp does
+        level_blend = turbulence_level[blend]
+        bounds_1000 = turbulence_std_array(
+            np.full(level_blend.shape, 1000), level_blend
+        )
+        bounds_2000 = turbulence_std_array(
+            np.full(level_blend.shape, 2000), level_blend
+        )
+        for sigma, sigma_1000, sigma_2000 in zip(
+            (sigma_u, sigma_w), bounds_1000[::2], bounds_2000[::2]
+        ):
+            slope = (sigma_2000 - sigma_1000) / (2000 - 1000)
+            sigma[blend] = slope * (h_ft[blend] - 1000) + sigma_1000
+    return sigma_u, sigma_u.copy(), sigma_w
+
+
+def turbulence_scale_length_array(h_m):
+    """
+    Array version of turbulence_scale_length, returning the same values for each element (up to
+    the last bit of the vectorized power function).
+    Parameters:
+    - h_m : array of altitudes in meters
+    Returns :
+    - Lu, Lv, Lw : arrays of turbulence scale lengths in the longitudinal, lateral and vertical
+    directions, m
+    """
+    h_m = np.maximum(np.asarray(h_m, dtype=float), 1)  # To avoid division by zero
+    m2feet = 3.28084
+    h_ft = h_m * m2feet
+    Lu = np.full(h_ft.shape, 2500 / m2feet)
+    Lv = np.full(h_ft.shape, 1250 / m2feet)
+    Lw = np.full(h_ft.shape, 1250 / m2feet)
+
+    low = h_ft <= 1000
+    Lu_ft = h_ft[low] / (0.177 + 0.000823 * h_ft[low]) ** 1.2
+    Lu[low] = Lu_ft / m2feet
+    Lv[low] = Lu_ft / 2 / m2feet
+    Lw[low] = h_ft[low] / 2 / m2feet
+
+    blend = (h_ft > 1000) & (h_ft < 2000)
+    if blend.any():
+        # Same bounds as turbulence_scale_length
+        bounds_1000 = turbulence_scale_length_array(np.array([1000]))
+        bounds_2000 = turbulence_scale_length_array(np.array([2000]))
+        for L, L_1000, L_2000 in zip((Lu, Lv, Lw), bounds_1000, bounds_2000):
+            slope = (L_2000 - L_1000) / (2000 - 1000)
+            L[blend] = slope * (h_ft[blend] - 1000) + L_1000
+    return Lu, Lv, Lw
+
+
+def turbulence_bandwidth_array(h_m, v):
+    """
+    Array version of turbulence_bandwidth.
+    Parameters:
+    - h_m : array of altitudes in meters
+    - v : aircraft speed in m.s-1, scalar or array broadcastable with h_m
+    """
+    Lu, Lv, Lw = turbulence_scale_length_array(h_m)
+    return 100 * np.asarray(v) / np.maximum(np.maximum(Lu, Lv), Lw)
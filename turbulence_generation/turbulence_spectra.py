@@ -297,3 +297,96 @@ def f_q(omega, parameters):
 
 def f_r(omega, parameters):
     return np.sqrt(phi_r(omega, parameters))
+
+
+def spectra_magnitudes(omega, parameters, out=None):
+    """
+    Computes the six spectrum modules f_u, f_v, f_w, f_p, f_q and f_r in a single pass. The terms
+    shared by several channels ((omega / V)², the denominators of the rotary spectra, f_v and f_w
+    for f_r and f_q) are computed once, and the square roots of the power spectra are taken on
+    their exponents, so that the fractional powers are evaluated once per channel.
+    Parameters :
+    - omega: non-negative frequencies, rad.s-1
+    - parameters: dictionary containing the spectrum parameters sigma_u, sigma_v, sigma_w, Lu,
+    Lv, Lw, b and V, scalars or arrays of shape (M, 1) for M flight conditions
+    - out: optional array of shape (6, len(omega)), or (M, 6, len(omega)), where the modules are
+    written
+    Returns the array of the modules, the channels u, v, w, p, q and r along the axis -2.
+    """
+    sigma_u = parameters["sigma_u"]
+    sigma_v = parameters["sigma_v"]
+    sigma_w = parameters["sigma_w"]
+    Lu = parameters["Lu"]
+    Lv = parameters["Lv"]
+    Lw = parameters["Lw"]
+    b = parameters["b"]
+    V = parameters["V"]
+    x2 = np.square(omega / V)
+    if out is None:
+        shape = np.broadcast_shapes(
+            np.shape(x2), *(np.shape(parameters[name]) for name in ("sigma_u", "Lu"))
+        )
+        out = np.empty(shape[:-1] + (6,) + shape[-1:])
+    u, v, w, p, q, r = (out[..., i, :] for i in range(6))
+    np.power(1 + (1.339 * Lu) ** 2 * x2, -5 / 12, out=u)
+    u *= sigma_u * np.sqrt(2 * Lu / np.pi)
+    for channel, sigma, L in ((v, sigma_v, Lv), (w, sigma_w, Lw)):
+        a = (2.678 * L) ** 2 * x2
+        np.power(1 + a, -11 / 12, out=channel)
+        channel *= np.sqrt(1 + 8 / 3 * a)
+        channel *= sigma * np.sqrt(2 * L / np.pi)
+    pq_denominator = 1 + (4 * b / np.pi) ** 2 * x2
+    np.sqrt(pq_denominator, out=p)
+    np.divide(sigma_w * np.sqrt(0.4 / Lw * (np.pi * Lw / 2 / b) ** (1 / 3)), p, out=p)
+    np.sqrt(x2 / pq_denominator, out=q)
+    q *= w
+    np.sqrt(x2 / (1 + (3 * b / np.pi) ** 2 * x2), out=r)
+    r *= v
+    return out
+
+
+def filter_polynomials(parameters):
+    """
+    Returns the numerator and denominator polynomials in s (coefficients by decreasing powers, as
+    numpy.polyval) of the rational filters Hu, Hv, Hw and Hp, and of the filters giving q from w
+    and r from v (Hq = Hq_w * Hw and Hr = Hr_v * Hv), as a dictionary {channel: (numerator,
+    denominator)} with the keys “u”, “v”, “w”, “p”, “q_w” and “r_v”.
+    Parameters :
+    - parameters: dictionary containing the filter parameters sigma_u, sigma_v, sigma_w, Lu, Lv,
+    Lw, b and V
+    """
+    V = parameters["V"]
+    b = parameters["b"]
+    Lu = parameters["Lu"]
+    Lw = parameters["Lw"]
+    polynomials = {
+        "u": (
+            parameters["sigma_u"]
+            * np.sqrt(2 * Lu / np.pi / V)
+            * np.array([0.25 * Lu / V, 1]),
+            np.array([0.1987 * (Lu / V) ** 2, 1.357 * Lu / V, 1]),
+        ),
+        "p": (
+            np.array(
+                [
+                    parameters["sigma_w"]
+                    * np.sqrt(0.8 / V)
+                    * (np.pi / 4 / b) ** (1 / 6)
+                    / (2 * Lw) ** (1 / 3)
+                ]
+            ),
+            np.array([4 * b / np.pi / V, 1]),
+        ),
+        "q_w": (np.array([1 / V, 0]), np.array([4 * b / np.pi / V, 1])),
+        "r_v": (np.array([-1 / V, 0]), np.array([3 * b / np.pi / V, 1])),
+    }
+    for channel in ("v", "w"):
+        L = parameters["L" + channel]
+        T = 2 * L / V
+        polynomials[channel] = (
+            parameters["sigma_" + channel]
+            * np.sqrt(2 * L / np.pi / V)
+            * np.array([0.3398 * T**2, 2.7478 * T, 1]),
+            np.array([0.1539 * T**3, 1.9754 * T**2, 2.9958 * T, 1]),
+        )
+    return polynomials